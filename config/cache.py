@@ -0,0 +1,121 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Generic, Hashable, Optional, TypeVar
+
+from config.settings import settings
+
+ValueType = TypeVar("ValueType")
+
+
+# Cache en memoria con tamaño acotado, expulsión LRU y expiración por TTL.
+# No es thread-safe: está pensado para usarse desde el event loop de la app.
+class TTLCache(Generic[ValueType]):
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, ValueType]] = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[ValueType]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: ValueType, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def invalidate(self, *keys: Hashable) -> None:
+        for key in keys:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# Claims ya decodificados del JWT, por token
+token_cache: TTLCache[dict[str, Any]] = TTLCache(
+    max_size=settings.AUTH_CACHE_MAX_SIZE, ttl=settings.AUTH_CACHE_TTL_SECONDS
+)
+# Copia del usuario autenticado, por email (el `sub` del token)
+user_cache: TTLCache[Any] = TTLCache(
+    max_size=settings.AUTH_CACHE_MAX_SIZE, ttl=settings.AUTH_CACHE_TTL_SECONDS
+)
+
+
+# Versión de token y estado de cada usuario, para validar tokens sin consultar la base (JWT_STATELESS).
+# Se mantiene con una relectura periódica de los usuarios modificados (ver run) y con las
+# actualizaciones que hace este mismo proceso en UserService
+class TokenVersionCache:
+    def __init__(self):
+        self._versions: dict[str, tuple[int, bool]] = {}
+        self._last_seen: Optional[Any] = None
+        self._last_full_reload = 0.0
+
+    def get(self, user_id: str) -> Optional[tuple[int, bool]]:
+        return self._versions.get(user_id)
+
+    def remember(self, user: Any) -> None:
+        self._versions[user.id] = (user.token_version, user.is_active)
+
+    def forget(self, user_id: str) -> None:
+        self._versions.pop(user_id, None)
+
+    async def refresh(self, session_factory: Any, full: bool = False) -> None:
+        # Import local: models importa config, así que no puede importarse a nivel de módulo
+        from sqlmodel import select
+
+        from models.models import User
+
+        statement = select(User.id, User.token_version, User.is_active, User.updated_at)
+        if not full and self._last_seen is not None:
+            statement = statement.where(User.updated_at >= self._last_seen)
+
+        async with session_factory() as session:
+            rows = (await session.execute(statement)).all()
+
+        versions = {} if full else self._versions
+        for user_id, token_version, is_active, updated_at in rows:
+            versions[user_id] = (token_version, is_active)
+            if updated_at and (self._last_seen is None or updated_at > self._last_seen):
+                self._last_seen = updated_at
+        self._versions = versions
+        if full:
+            self._last_full_reload = time.monotonic()
+
+    async def run(self, session_factory: Any, interval: float, full_reload_interval: float) -> None:
+        while True:
+            full = time.monotonic() - self._last_full_reload >= full_reload_interval
+            try:
+                await self.refresh(session_factory, full=full)
+            except Exception as ex:
+                # Si falla la relectura se conserva lo que había; los tokens desconocidos van a la base
+                print(f"Token version refresh failed: {ex}")
+            await asyncio.sleep(interval)
+
+
+token_versions = TokenVersionCache()
+
+
+# Clientes (por cabecera Authorization) que escribieron hace poco: sus lecturas van al primario
+# durante READ_YOUR_WRITES_SECONDS para no ver datos anteriores a su escritura por el retraso de las réplicas
+recent_writers: TTLCache[bool] = TTLCache(
+    max_size=settings.AUTH_CACHE_MAX_SIZE, ttl=settings.READ_YOUR_WRITES_SECONDS
+)
@@ -1,10 +1,70 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+import itertools
+
+from sqlalchemy import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from config.metrics import install_query_hooks
+from config.pool import MeteredQueuePool
+from config.profiler import install_profiler
 from config.settings import settings
 
-engine = create_async_engine(settings.DATABASE_URL, echo=settings.ECHO_SQL)
+
+def _engine_options(database_url: str) -> dict:
+    url = make_url(database_url)
+    options = {'url': url, 'echo': settings.ECHO_SQL, 'pool_pre_ping': settings.DB_POOL_PRE_PING}
+
+    # SQLite en memoria usa un StaticPool (una sola conexión), no admite las opciones de QueuePool
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return options
+
+    options.update(
+        poolclass=MeteredQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    if url.drivername == 'postgresql+asyncpg':
+        # Cache de sentencias preparadas de asyncpg y del adaptador de SQLAlchemy (0 para usar pgbouncer)
+        options['url'] = url.update_query_dict(
+            {'prepared_statement_cache_size': str(settings.DB_STATEMENT_CACHE_SIZE)}
+        )
+        options['connect_args'] = {'statement_cache_size': settings.DB_STATEMENT_CACHE_SIZE}
+    return options
+
+
+def _create_engine(database_url: str) -> AsyncEngine:
+    engine = create_async_engine(**_engine_options(database_url))
+    install_query_hooks(engine)
+    if settings.SQL_PROFILER:
+        install_profiler(engine, slow_query_ms=settings.SLOW_QUERY_MS)
+    return engine
+
+
+engine = _create_engine(settings.DATABASE_URL)
 
 async_session = async_sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
+
+# Réplicas de solo lectura, cada una con su propio pool. Sin réplicas las lecturas van al primario
+replica_engines = [_create_engine(url.strip()) for url in settings.DATABASE_REPLICA_URLS.split(',') if url.strip()]
+replica_sessions = [
+    async_sessionmaker(replica, class_=AsyncSession, expire_on_commit=False) for replica in replica_engines
+]
+_next_replica = itertools.cycle(replica_sessions)
+
+
+# Fábrica de sesiones para una lectura: las réplicas se turnan (round robin)
+def read_session_factory(use_primary: bool = False) -> async_sessionmaker:
+    if use_primary or not replica_sessions:
+        return async_session
+    return next(_next_replica)
+
+
+def pool_stats(database_engine: AsyncEngine = engine) -> dict:
+    pool = database_engine.sync_engine.pool
+    if isinstance(pool, MeteredQueuePool):
+        return pool.stats()
+    return {'status': pool.status()}
@@ -1,25 +1,39 @@
-from typing import AsyncGenerator
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, AsyncIterator, Union
 
-from fastapi import HTTPException, status
+from fastapi import HTTPException, Request, status
 from fastapi.params import Depends, Path
 from jose import jwt, JWTError
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import make_transient_to_detached
 
-from config.security import oauth2_scheme, ALGORITHM, SECRET_KEY
-from models.models import User
+from config.etag import Version
+from config.security import oauth2_scheme, ALGORITHM, SECRET_KEY, TokenUser
+from config.settings import settings
+from models.models import Task, User
 from repositories.task_repo import TaskRepository
 from repositories.user_repo import UserRepository
 from services.auth_service import AuthService
 from services.task_service import TaskService
 from services.user_service import UserService
 
-from .database import async_session
+from .cache import token_cache, user_cache, token_versions
+from .database import async_session, read_session_factory
+from .replicas import prefers_primary
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session() as session:
         yield session
 
 
+# Sesión para los GET: una réplica de lectura, salvo que el cliente pida el primario (X-Read-From)
+# o haya escrito hace poco (ver ReadYourWritesMiddleware). Sin réplicas configuradas es el primario
+async def get_read_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    async with read_session_factory(prefers_primary(request.headers))() as session:
+        yield session
+
+
 async def get_user_repository(session: AsyncSession = Depends(get_session)) -> UserRepository:
     return UserRepository(session)
 
@@ -28,6 +42,14 @@ async def get_task_repository(session: AsyncSession = Depends(get_session)):
     return TaskRepository(session)
 
 
+async def get_read_user_repository(session: AsyncSession = Depends(get_read_session)) -> UserRepository:
+    return UserRepository(session)
+
+
+async def get_read_task_repository(session: AsyncSession = Depends(get_read_session)) -> TaskRepository:
+    return TaskRepository(session)
+
+
 async def get_user_service(user_repo: UserRepository = Depends(get_user_repository)) -> UserService:
     return UserService(user_repo)
 
@@ -37,28 +59,79 @@ async def get_task_service(task_repo: TaskRepository = Depends(get_task_reposito
     return TaskService(task_repo, user_repo)
 
 
+async def get_read_user_service(user_repo: UserRepository = Depends(get_read_user_repository)) -> UserService:
+    return UserService(user_repo)
+
+
+async def get_read_task_service(task_repo: TaskRepository = Depends(get_read_task_repository),
+                                user_repo: UserRepository = Depends(get_read_user_repository)) -> TaskService:
+    return TaskService(task_repo, user_repo)
+
+
+# Para respuestas en streaming: la sesión de get_session se cierra antes de que se envíe el cuerpo,
+# así que el generador abre y cierra la suya propia mientras dura la respuesta
+@asynccontextmanager
+async def open_task_service(session_factory: async_sessionmaker = async_session) -> AsyncIterator[TaskService]:
+    async with session_factory() as session:
+        yield TaskService(TaskRepository(session), UserRepository(session))
+
+
 async def get_auth_service(session: AsyncSession = Depends(get_session)) -> AuthService:
     return AuthService(session)
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), session: AsyncSession = Depends(get_session)) -> User:
+async def get_current_user(token: str = Depends(oauth2_scheme),
+                           session: AsyncSession = Depends(get_session)) -> Union[User, TokenUser]:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get('sub')
-        if email is None:
+    payload = token_cache.get(token)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
             raise credentials_exception
-    except JWTError:
+        # Nunca se cachea un token más allá de su propia expiración
+        token_cache.set(token, payload, ttl=payload.get('exp', 0) - time.time())
+
+    email: str = payload.get('sub')
+    if email is None:
         raise credentials_exception
 
+    # Modo stateless: la identidad sale de los claims y la revocación se comprueba contra la versión
+    # de token cacheada, sin consultar la base. Los usuarios que aún no están en la cache (o los
+    # tokens antiguos sin `uid`) siguen el camino normal
+    user_id = payload.get('uid')
+    if settings.JWT_STATELESS and user_id is not None:
+        known = token_versions.get(user_id)
+        if known is not None:
+            token_version, is_active = known
+            if not is_active or payload.get('ver') != token_version:
+                raise credentials_exception
+            return TokenUser(id=user_id, email=email, is_admin=bool(payload.get('adm')))
+
+    cached_user = user_cache.get(email)
+    if cached_user is not None:
+        if 'ver' in payload and payload['ver'] != cached_user.token_version:
+            raise credentials_exception
+        # Se adjunta la copia cacheada a la sesión del request sin consultar la base (load=False):
+        # así los repositorios la encuentran en el identity map al buscar este usuario por id
+        return await session.merge(cached_user, load=False)
+
     user_repo = UserRepository(session)
     user = await user_repo.get_user_by_email(email)
     if user is None or not user.is_active:
         raise credentials_exception
+    # Un token emitido antes del último cambio de credenciales o permisos ya no es válido
+    if 'ver' in payload and payload['ver'] != user.token_version:
+        raise credentials_exception
+    token_versions.remember(user)
+    # Se guarda una copia separada para no compartir entre requests una instancia ligada a una sesión
+    snapshot = User(**user.model_dump())
+    make_transient_to_detached(snapshot)
+    user_cache.set(email, snapshot)
     return user
 
 
@@ -77,6 +150,7 @@ async def is_owner_or_admin_user(
 
     return current_user
 
+
 def admin_required(current_user: User = Depends(get_current_user)):
     if not current_user.is_admin:
         raise HTTPException(
@@ -85,9 +159,10 @@ def admin_required(current_user: User = Depends(get_current_user)):
         )
     return current_user
 
+
 async def is_owner_or_admin_task(
     current_user: User = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     task_id: str = Path(...)
 ):
     if current_user.is_admin:
@@ -105,4 +180,48 @@ async def is_owner_or_admin_task(
             detail="You are not the owner of this task."
         )
 
-    return current_user
\ No newline at end of file
+    return current_user
+
+
+# Igual que is_owner_or_admin_task, pero carga la tarea con sus relaciones y la devuelve a la ruta.
+# La tarea queda en el identity map de la sesión del request, que es la misma que usa TaskService,
+# así que las búsquedas posteriores por su id no vuelven a la base
+async def get_authorized_task(
+    current_user: User = Depends(get_current_user),
+    task_repo: TaskRepository = Depends(get_task_repository),
+    task_id: str = Path(...)
+) -> Task:
+    task = await task_repo.get_object_with_relations(task_id)
+
+    if not task:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+
+    if not current_user.is_admin and task.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You are not the owner of this task."
+        )
+
+    return task
+
+
+# Para los GET condicionales: autoriza con la consulta de versión (dueño, updated_at) en lugar de
+# cargar la tarea, de modo que un 304 no carga ni serializa la tarea, su usuario ni sus subtareas
+async def get_authorized_task_version(
+    current_user: User = Depends(get_current_user),
+    task_service: TaskService = Depends(get_read_task_service),
+    task_id: str = Path(...)
+) -> Version:
+    version_and_owner = await task_service.get_version_and_owner(task_id)
+
+    if not version_and_owner:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+
+    owner_id, version = version_and_owner
+    if not current_user.is_admin and owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You are not the owner of this task."
+        )
+
+    return version
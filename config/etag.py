@@ -0,0 +1,66 @@
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+
+# Validadores HTTP de un recurso: un ETag fuerte y, si se conoce, la fecha de última modificación
+@dataclass(frozen=True)
+class Version:
+    etag: str
+    last_modified: Optional[datetime] = None
+
+    def headers(self) -> dict:
+        headers = {'ETag': self.etag}
+        if self.last_modified is not None:
+            headers['Last-Modified'] = format_datetime(_to_utc(self.last_modified), usegmt=True)
+        return headers
+
+
+# updated_at se guarda como hora local sin zona (datetime.now()); astimezone la interpreta así
+def _to_utc(value: datetime) -> datetime:
+    return value.astimezone(timezone.utc).replace(microsecond=0)
+
+
+# El ETag es un hash de las partes que determinan el contenido de la respuesta (ids, updated_at, conteos),
+# así que se calcula con una consulta de versión barata sin cargar ni serializar el recurso
+def make_version(*parts, last_modified: Optional[datetime] = None) -> Version:
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+    return Version(etag=f'"{digest}"', last_modified=last_modified)
+
+
+def latest(*values: Optional[datetime]) -> Optional[datetime]:
+    return max((value for value in values if value is not None), default=None)
+
+
+def is_not_modified(request: Request, version: Version) -> bool:
+    # If-None-Match tiene prioridad sobre If-Modified-Since (RFC 9110, 13.2.2)
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        if if_none_match.strip() == '*':
+            return True
+        tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+        return version.etag in tags
+
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since and version.last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return _to_utc(version.last_modified) <= since
+    return False
+
+
+# Añade ETag/Last-Modified a la respuesta de la ruta y devuelve un 304 si el cliente ya tiene esta versión
+def conditional_response(request: Request, response: Response, version: Version) -> Optional[Response]:
+    response.headers.update(version.headers())
+    if is_not_modified(request, version):
+        return Response(status_code=304, headers=version.headers())
+    return None
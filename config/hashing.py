@@ -0,0 +1,100 @@
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+from passlib.context import CryptContext
+
+from config.settings import settings
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+ResultType = TypeVar("ResultType")
+
+
+# Funciones a nivel de módulo para que puedan enviarse a un ProcessPoolExecutor
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(password, hashed_password)
+
+
+# bcrypt tarda ~200ms por llamada, así que nunca debe ejecutarse en el event loop.
+# Los trabajos se envían a un pool acotado y un semáforo limita cuántos hay en curso;
+# el resto espera en cola sin bloquear los demás requests.
+class PasswordHasher:
+    def __init__(self, executor_type: str = 'thread', max_workers: Optional[int] = None,
+                 max_concurrency: Optional[int] = None):
+        self.executor_type = executor_type
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_concurrency = max_concurrency or self.max_workers
+        self._executor: Optional[Executor] = None
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        # Métricas
+        self.queued = 0
+        self.in_progress = 0
+        self.completed = 0
+        self.total_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == 'process':
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='pwd-hash')
+        return self._executor
+
+    async def _run(self, func: Callable[..., ResultType], *args) -> ResultType:
+        queued_at = time.perf_counter()
+        self.queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        started_at = time.perf_counter()
+        self.total_wait_seconds += started_at - queued_at
+        self.in_progress += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.in_progress -= 1
+            self.completed += 1
+            self.total_run_seconds += time.perf_counter() - started_at
+            self._semaphore.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(_verify, password, hashed_password)
+
+    def stats(self) -> dict:
+        return {
+            'executor': self.executor_type,
+            'max_workers': self.max_workers,
+            'max_concurrency': self.max_concurrency,
+            'queued': self.queued,
+            'in_progress': self.in_progress,
+            'completed': self.completed,
+            'total_wait_seconds': self.total_wait_seconds,
+            'total_run_seconds': self.total_run_seconds,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    executor_type=settings.PASSWORD_HASH_EXECUTOR,
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_concurrency=settings.PASSWORD_HASH_MAX_CONCURRENCY,
+)
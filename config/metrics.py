@@ -0,0 +1,235 @@
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# Implementación mínima de las métricas de Prometheus (formato de texto 0.0.4),
+# suficiente para un solo proceso y sin depender de prometheus_client
+class Metric:
+    type_name = 'untyped'
+
+    def __init__(self, name: str, description: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+
+    def header(self) -> List[str]:
+        return [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} {self.type_name}']
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    type_name = 'counter'
+
+    def __init__(self, name: str, description: str, label_names: Tuple[str, ...] = ()):
+        super().__init__(name, description, label_names)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for label_values, value in self._values.items():
+            lines.append(f'{self.name}{_format_labels(self.label_names, label_values)} {_format_value(value)}')
+        return lines
+
+
+class Gauge(Counter):
+    type_name = 'gauge'
+
+    def dec(self, *label_values: str, amount: float = 1) -> None:
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, *label_values: str, value: float) -> None:
+        self._values[label_values] = value
+
+
+class Histogram(Metric):
+    type_name = 'histogram'
+
+    def __init__(self, name: str, description: str, label_names: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, description, label_names)
+        self.buckets = buckets
+        # Por cada combinación de etiquetas: cuentas por bucket (no acumuladas), suma y total
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        counts, totals = self._values.setdefault(label_values, ([0] * (len(self.buckets) + 1), [0.0, 0]))
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+                break
+        else:
+            counts[-1] += 1
+        totals[0] += value
+        totals[1] += 1
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for label_values, (counts, (total, count)) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += bucket_count
+                labels = _format_labels((*self.label_names, 'le'), (*label_values, bound))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.label_names, label_values)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {_format_value(count)}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self, extra: Iterable[Metric] = ()) -> str:
+        lines: List[str] = []
+        for metric in (*self.metrics, *extra):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+# Convierte un diccionario de estadísticas (pool, hasher) en gauges para /metrics
+def stats_gauges(prefix: str, description: str, stats: dict) -> List[Gauge]:
+    gauges = []
+    for key, value in stats.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            gauge = Gauge(f'{prefix}_{key}', f'{description}: {key}.')
+            gauge.set(value=value)
+            gauges.append(gauge)
+    return gauges
+
+
+http_requests_total = registry.register(Counter(
+    'http_requests_total', 'Total de requests HTTP por ruta y código de estado.', ('method', 'route', 'status')
+))
+http_requests_in_progress = registry.register(Gauge(
+    'http_requests_in_progress', 'Requests HTTP en curso.', ('method',)
+))
+http_request_duration_seconds = registry.register(Histogram(
+    'http_request_duration_seconds', 'Latencia de los requests HTTP por ruta.', ('method', 'route')
+))
+http_request_db_queries = registry.register(Histogram(
+    'http_request_db_queries', 'Sentencias SQL ejecutadas por request.', ('method', 'route'), QUERY_COUNT_BUCKETS
+))
+http_request_db_seconds = registry.register(Histogram(
+    'http_request_db_seconds', 'Tiempo total en la base de datos por request.', ('method', 'route')
+))
+db_queries_total = registry.register(Counter(
+    'db_queries_total', 'Total de sentencias SQL ejecutadas.'
+))
+db_query_duration_seconds = registry.register(Histogram(
+    'db_query_duration_seconds', 'Duración de cada sentencia SQL.'
+))
+tasks_overdue_total = registry.register(Counter(
+    'tasks_overdue_total', 'Tareas abiertas cuya fecha límite venció (planificador de vencimientos).'
+))
+
+
+# Acumulador de las sentencias ejecutadas durante el request en curso
+@dataclass
+class QueryStats:
+    count: int = 0
+    seconds: float = 0.0
+
+
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar('current_query_stats', default=None)
+
+
+# Los eventos de cursor corren dentro del greenlet de SQLAlchemy, que comparte el contexto
+# (y por tanto current_query_stats) con la tarea del request que lanzó la consulta
+def install_query_hooks(engine: AsyncEngine) -> None:
+    @event.listens_for(engine.sync_engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started_at', []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_started_at'].pop()
+        db_queries_total.inc()
+        db_query_duration_seconds.observe(elapsed)
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.count += 1
+            stats.seconds += elapsed
+
+
+# Middleware ASGI (sin BaseHTTPMiddleware para no añadir una tarea por request).
+# Con query_headers cada respuesta lleva X-Query-Count y X-DB-Time (ms) del propio request
+class MetricsMiddleware:
+    def __init__(self, app, query_headers: bool = False):
+        self.app = app
+        self.query_headers = query_headers
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        method = scope['method']
+        status_code = 500
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+                if self.query_headers:
+                    message.setdefault('headers', [])
+                    message['headers'] = [
+                        *message['headers'],
+                        (b'x-query-count', str(stats.count).encode()),
+                        (b'x-db-time', f'{stats.seconds * 1000:.2f}'.encode()),
+                    ]
+            await send(message)
+
+        http_requests_in_progress.inc(method)
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started_at
+            current_query_stats.reset(token)
+            http_requests_in_progress.dec(method)
+
+            # Plantilla de la ruta (/tasks/{task_id}) para no crear una serie por cada id
+            route = scope.get('route')
+            route_path = getattr(route, 'path', '<unmatched>')
+            http_requests_total.inc(method, route_path, str(status_code))
+            http_request_duration_seconds.observe(elapsed, method, route_path)
+            http_request_db_queries.observe(stats.count, method, route_path)
+            http_request_db_seconds.observe(stats.seconds, method, route_path)
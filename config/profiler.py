@@ -0,0 +1,41 @@
+import logging
+import time
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger('sql_profiler')
+
+
+def _explain(conn, statement: str, parameters) -> str:
+    prefix = 'EXPLAIN QUERY PLAN ' if conn.dialect.name == 'sqlite' else 'EXPLAIN '
+    # Cursor DBAPI directo: no pasa por los eventos del engine, así que no se vuelve a perfilar
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+    finally:
+        cursor.close()
+
+
+# Modo depuración (SQL_PROFILER): registra en el log cada sentencia que supere slow_query_ms
+# junto con sus parámetros y su plan de ejecución, para encontrar N+1 e índices que faltan
+def install_profiler(engine: AsyncEngine, slow_query_ms: float) -> None:
+    @event.listens_for(engine.sync_engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('profiler_started_at', []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info['profiler_started_at'].pop()) * 1000
+        if elapsed_ms < slow_query_ms:
+            return
+
+        plan = ''
+        # Solo se explican las lecturas: EXPLAIN de una escritura no aporta y executemany no se puede explicar
+        if not executemany and statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            try:
+                plan = _explain(conn, statement, parameters)
+            except Exception as ex:
+                plan = f'<EXPLAIN failed: {ex}>'
+        logger.warning('Slow query (%.1f ms): %s\nparams: %r\nplan:\n%s', elapsed_ms, statement, parameters, plan)
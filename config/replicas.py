@@ -0,0 +1,37 @@
+from starlette.datastructures import Headers
+
+from .cache import recent_writers
+
+# Cabecera para forzar una lectura del primario en un request concreto (X-Read-From: primary)
+READ_FROM_HEADER = 'x-read-from'
+READ_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+
+def prefers_primary(headers: Headers) -> bool:
+    if headers.get(READ_FROM_HEADER, '').strip().lower() == 'primary':
+        return True
+    authorization = headers.get('authorization')
+    return authorization is not None and recent_writers.get(authorization) is not None
+
+
+# Marca al cliente como escritor reciente al empezar cada request de escritura y otra vez al terminar,
+# así la ventana cubre también las lecturas que haga mientras la escritura está en curso
+class ReadYourWritesMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] in READ_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        authorization = Headers(scope=scope).get('authorization')
+        if authorization is None:
+            await self.app(scope, receive, send)
+            return
+
+        recent_writers.set(authorization, True)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            recent_writers.set(authorization, True)
@@ -0,0 +1,144 @@
+import asyncio
+import heapq
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, Tuple
+
+# Se llama con (task_id, user_id, end_at) cuando vence una tarea abierta
+DeadlineCallback = Callable[[str, str, datetime], Awaitable[None]]
+
+
+# Planificador en memoria de los vencimientos (end_at) de las tareas abiertas.
+# Un heap ordenado por end_at da el próximo vencimiento en O(1) y cada alta o cambio cuesta O(log n);
+# el bucle de run duerme hasta ese vencimiento (o hasta que llegue uno anterior) en lugar de recorrer
+# la tabla periódicamente. Al cancelar o reprogramar solo se actualiza _deadlines: las entradas viejas
+# del heap se descartan al salir (borrado perezoso) y el heap se reconstruye si acumula demasiadas.
+# Antes de avisar se confirma contra la base que la tarea sigue abierta y vencida, así que una entrada
+# desactualizada (p. ej. por una escritura en otro proceso) nunca produce un aviso falso.
+# No es thread-safe: está pensado para usarse desde el event loop de la app
+class DeadlineScheduler:
+    def __init__(self):
+        self._heap: List[Tuple[datetime, str]] = []
+        self._deadlines: dict[str, Tuple[datetime, str]] = {}
+        self._callbacks: List[DeadlineCallback] = []
+        self._wakeup = asyncio.Event()
+        self.running = False
+
+    def add_callback(self, callback: DeadlineCallback) -> None:
+        self._callbacks.append(callback)
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def next_deadline(self) -> Optional[datetime]:
+        self._discard_stale()
+        return self._heap[0][0] if self._heap else None
+
+    # Se llama después de confirmar cada escritura; sin el planificador en marcha no guarda nada
+    def schedule(self, task_id: str, user_id: str, end_at: Optional[datetime], completed: bool = False) -> None:
+        if not self.running:
+            return
+        if completed or end_at is None:
+            self.cancel(task_id)
+            return
+        # En el heap todas las fechas son hora local sin zona, como datetime.now() y lo guardado en la base
+        if end_at.tzinfo is not None:
+            end_at = end_at.astimezone().replace(tzinfo=None)
+        if self._deadlines.get(task_id) == (end_at, user_id):
+            return
+
+        self._deadlines[task_id] = (end_at, user_id)
+        heapq.heappush(self._heap, (end_at, task_id))
+        # Despierta al bucle si este vencimiento pasa a ser el más próximo
+        if self._heap[0] == (end_at, task_id):
+            self._wakeup.set()
+
+    def cancel(self, *task_ids: str) -> None:
+        for task_id in task_ids:
+            self._deadlines.pop(task_id, None)
+        if len(self._heap) > 2 * len(self._deadlines) + 1024:
+            self._heap = [(end_at, task_id) for task_id, (end_at, _) in self._deadlines.items()]
+            heapq.heapify(self._heap)
+
+    def _discard_stale(self) -> None:
+        while self._heap:
+            end_at, task_id = self._heap[0]
+            current = self._deadlines.get(task_id)
+            if current is not None and current[0] == end_at:
+                return
+            heapq.heappop(self._heap)
+
+    def _drop_next(self) -> None:
+        if self._heap:
+            _, task_id = heapq.heappop(self._heap)
+            self._deadlines.pop(task_id, None)
+
+    def _pop_due(self, now: datetime) -> List[str]:
+        due = []
+        self._discard_stale()
+        while self._heap and self._heap[0][0] <= now:
+            _, task_id = heapq.heappop(self._heap)
+            del self._deadlines[task_id]
+            due.append(task_id)
+            self._discard_stale()
+        return due
+
+    # Carga los vencimientos futuros por el índice parcial ix_tasks_open_end_at. Las tareas que vencieron
+    # mientras la app estaba apagada no se avisan (siguen apareciendo en GET /users/{user_id}/tasks/overdue)
+    async def load(self, session_factory: Any) -> None:
+        # Import local: los repositorios importan config, así que no pueden importarse a nivel de módulo
+        from repositories.task_repo import TaskRepository
+
+        async with session_factory() as session:
+            async for task_id, user_id, end_at in TaskRepository(session).stream_open_deadlines(datetime.now()):
+                # Lo que se haya programado mientras tanto viene de una escritura más reciente que esta lectura
+                if task_id not in self._deadlines:
+                    self._deadlines[task_id] = (end_at, user_id)
+                    self._heap.append((end_at, task_id))
+        heapq.heapify(self._heap)
+
+    async def _fire(self, session_factory: Any, task_ids: Iterable[str]) -> None:
+        from repositories.task_repo import TaskRepository
+
+        async with session_factory() as session:
+            overdue = await TaskRepository(session).get_overdue_deadlines(task_ids, datetime.now())
+        for task_id, user_id, end_at in overdue:
+            for callback in self._callbacks:
+                try:
+                    await callback(task_id, user_id, end_at)
+                except Exception as ex:
+                    print(f"Deadline callback failed for task {task_id}: {ex}")
+
+    async def run(self, session_factory: Any) -> None:
+        self.running = True
+        try:
+            await self.load(session_factory)
+            while True:
+                self._wakeup.clear()
+                # Un error con una entrada no detiene el planificador: se descarta y se sigue con las demás
+                try:
+                    due = self._pop_due(datetime.now())
+                    next_deadline = None if due else self.next_deadline()
+                    timeout = (next_deadline - datetime.now()).total_seconds() if next_deadline else None
+                except Exception as ex:
+                    print(f"Invalid deadline entry discarded: {ex}")
+                    self._drop_next()
+                    continue
+
+                if due:
+                    try:
+                        await self._fire(session_factory, due)
+                    except Exception as ex:
+                        print(f"Deadline check failed: {ex}")
+                    continue
+
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.running = False
+            self._heap.clear()
+            self._deadlines.clear()
+
+
+deadline_scheduler = DeadlineScheduler()
@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
@@ -10,6 +11,21 @@ ALGORITHM = settings.ALGORITHM
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 REFRESH_TOKEN_EXPIRE_DAYS = settings.REFRESH_TOKEN_EXPIRE_DAYS
 
+
+# Identidad reconstruida solo a partir de los claims del token (modo JWT_STATELESS)
+@dataclass(frozen=True)
+class TokenUser:
+    id: str
+    email: str
+    is_admin: bool
+    is_active: bool = True
+
+
+# Claims de identidad que llevan los tokens: el id, si es admin y la versión de token del usuario
+def token_claims(user) -> dict:
+    return {"sub": user.email, "uid": user.id, "adm": user.is_admin, "ver": user.token_version}
+
+
 def create_token(token_type: str, data: dict):
     to_encode = data.copy()
     expire: datetime = datetime.now() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
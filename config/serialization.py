@@ -0,0 +1,22 @@
+from typing import Any, Optional
+
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
+from starlette.responses import Response
+
+# Respuesta por defecto de la app: orjson codifica bastante más rápido que el json de la stdlib
+DefaultJSONResponse = ORJSONResponse
+
+
+# Camino rápido para listas grandes: pydantic-core valida directamente desde los atributos de los
+# objetos del ORM y serializa a bytes, sin pasar por jsonable_encoder ni por un dict intermedio.
+# FastAPI no copia los headers del `response` inyectado cuando la ruta devuelve un Response,
+# así que se copian aquí (p. ej. ETag y Last-Modified)
+def json_response(adapter: TypeAdapter, content: Any, response: Optional[Response] = None,
+                  status_code: int = 200) -> Response:
+    body = adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+    headers = {
+        key: value for key, value in (response.headers.items() if response is not None else ())
+        if key not in ('content-length', 'content-type')
+    }
+    return Response(content=body, status_code=status_code, media_type='application/json', headers=headers)
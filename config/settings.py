@@ -1,3 +1,5 @@
+from typing import Literal, Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -6,6 +8,16 @@ class Settings(BaseSettings):
     DEBUG: bool = False
     PORT: int = 8000
     ECHO_SQL: bool = False
+    SQL_PROFILER: bool = False # cabeceras X-Query-Count/X-DB-Time y log de consultas lentas con su plan
+    SLOW_QUERY_MS: float = 100
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30 # segundos esperando una conexión libre antes de fallar
+    DB_POOL_RECYCLE: int = -1 # segundos de vida de una conexión, -1 para no reciclar
+    DB_POOL_PRE_PING: bool = False
+    DB_STATEMENT_CACHE_SIZE: int = 100 # solo asyncpg
+    DATABASE_REPLICA_URLS: str = '' # réplicas de solo lectura para los GET, separadas por comas
+    READ_YOUR_WRITES_SECONDS: float = 5 # tras una escritura, los GET del mismo cliente leen del primario
     PROJECT_NAME: str
     PROJECT_DESCRIPTION: str
     PROJECT_VERSION: str
@@ -13,6 +25,19 @@ class Settings(BaseSettings):
     ALGORITHM: str = 'HS256'
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30 # 30 minutos en default
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7 # 7 días en default
+    AUTH_CACHE_TTL_SECONDS: float = 30 # vida de token/usuario cacheados en get_current_user
+    AUTH_CACHE_MAX_SIZE: int = 4096
+    JWT_STATELESS: bool = False # autorizar con los claims del token sin leer el usuario de la base
+    TOKEN_VERSION_REFRESH_SECONDS: float = 10 # cada cuánto se releen las versiones de token cambiadas
+    TOKEN_VERSION_FULL_RELOAD_SECONDS: float = 300 # recarga completa (detecta usuarios borrados)
+    PASSWORD_HASH_EXECUTOR: Literal['thread', 'process'] = 'thread'
+    PASSWORD_HASH_WORKERS: Optional[int] = None # por defecto min(4, núcleos disponibles)
+    PASSWORD_HASH_MAX_CONCURRENCY: Optional[int] = None # por defecto igual a PASSWORD_HASH_WORKERS
+    PAGE_MAX_LIMIT: int = 1000 # máximo de filas por página en los listados
+    TASK_BULK_MAX_ITEMS: int = 5000 # máximo de tareas por request en /tasks/bulk
+    TASK_SEARCH_MAX_TERMS: int = 16 # palabras de la consulta que se usan en /tasks/search
+    TASK_IMPORT_CHUNK_SIZE: int = 1000 # líneas por transacción en /tasks/import
+    TASK_DEADLINE_SCHEDULER: bool = False # avisar de las tareas que vencen (activarlo en un solo proceso)
 
     model_config = SettingsConfigDict(env_file=".env")
 
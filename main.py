@@ -1,20 +1,57 @@
+import asyncio
 from contextlib import asynccontextmanager
+from datetime import datetime
 
-from fastapi import FastAPI, status
-from starlette.responses import JSONResponse
+from fastapi import FastAPI, Depends, status
+from starlette.responses import JSONResponse, PlainTextResponse
 
+from config.cache import token_versions
+from config.database import async_session, engine, pool_stats, replica_engines
+from config.dependencies import admin_required
+from config.hashing import password_hasher
+from config.metrics import MetricsMiddleware, registry, stats_gauges, tasks_overdue_total
+from config.replicas import ReadYourWritesMiddleware
+from config.scheduler import deadline_scheduler
+from config.serialization import DefaultJSONResponse
 from config.settings import settings
 from routes.task_routes import router as task_router
 from routes.user_routes import router as user_router
 from routes.auth_routes import router as auth_router
 
 
+# Callbacks del planificador de vencimientos (se pueden registrar más con add_callback)
+async def count_overdue_task(task_id: str, user_id: str, end_at: datetime) -> None:
+    tasks_overdue_total.inc()
+
+
+deadline_scheduler.add_callback(count_overdue_task)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # ya no es necesaria gracias a alembic
     # create_db_and_tables()
+    refresher = None
+    if settings.JWT_STATELESS:
+        # Mantiene al día las versiones de token con las que se validan los tokens sin ir a la base
+        refresher = asyncio.create_task(token_versions.run(
+            async_session,
+            interval=settings.TOKEN_VERSION_REFRESH_SECONDS,
+            full_reload_interval=settings.TOKEN_VERSION_FULL_RELOAD_SECONDS,
+        ))
+    scheduler = None
+    if settings.TASK_DEADLINE_SCHEDULER:
+        # Avisa de los vencimientos de end_at a los callbacks registrados en deadline_scheduler
+        scheduler = asyncio.create_task(deadline_scheduler.run(async_session))
     yield
     print("Apagando la app...")
+    if refresher is not None:
+        refresher.cancel()
+    if scheduler is not None:
+        scheduler.cancel()
+    password_hasher.shutdown()
+    for database_engine in (engine, *replica_engines):
+        await database_engine.dispose()
 
 
 app = FastAPI(
@@ -23,7 +60,11 @@ app = FastAPI(
     title=settings.PROJECT_NAME,
     description=settings.PROJECT_DESCRIPTION,
     version=settings.PROJECT_VERSION,
+    default_response_class=DefaultJSONResponse,
 )
+app.add_middleware(MetricsMiddleware, query_headers=settings.SQL_PROFILER)
+if replica_engines:
+    app.add_middleware(ReadYourWritesMiddleware)
 
 
 @app.get('/')
@@ -31,6 +72,24 @@ async def root():
     return JSONResponse({'message': 'Welcome to the todo app API :)', 'status': status.HTTP_200_OK})
 
 
+# Métricas en formato de texto de Prometheus
+@app.get('/metrics', include_in_schema=False)
+async def metrics():
+    extra = [
+        *stats_gauges('db_pool', 'Pool de conexiones', pool_stats()),
+        *(gauge for index, replica in enumerate(replica_engines)
+          for gauge in stats_gauges(f'db_replica{index}_pool', f'Pool de conexiones de la réplica {index}',
+                                    pool_stats(replica))),
+        *stats_gauges('password_hash', 'Pool de hashing de contraseñas', password_hasher.stats()),
+    ]
+    return PlainTextResponse(registry.render(extra), media_type='text/plain; version=0.0.4')
+
+
+@app.get('/stats/pool', dependencies=[Depends(admin_required)])
+async def database_pool_stats():
+    return pool_stats()
+
+
 app.include_router(user_router)
 app.include_router(task_router)
 app.include_router(auth_router)
@@ -0,0 +1,28 @@
+import argparse
+import asyncio
+
+from config.database import async_session, engine
+from repositories.task_stats_repo import TaskStatsRepository
+
+
+async def rebuild_task_stats(user_id: str = None) -> None:
+    async with async_session() as session:
+        await TaskStatsRepository(session).rebuild(user_id)
+    await engine.dispose()
+    print(f"task_stats rebuilt{f' for user {user_id}' if user_id else ''}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Tareas de mantenimiento de la todo app")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    rebuild = commands.add_parser('rebuild-task-stats', help="Recalcula task_stats desde la tabla tasks")
+    rebuild.add_argument('--user-id', help="Solo los contadores de este usuario")
+
+    args = parser.parse_args()
+    if args.command == 'rebuild-task-stats':
+        asyncio.run(rebuild_task_stats(args.user_id))
+
+
+if __name__ == '__main__':
+    main()
@@ -25,6 +25,16 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = SQLModel.metadata
 
+
+# Objetos de búsqueda de texto creados a mano en las migraciones 84396c3c517f y a8f3d25c6b91 (tabla FTS5,
+# sus tablas internas y tasks_fts_ids en SQLite, columna tsvector e índice GIN en Postgres); autogenerate no debe intentar borrarlos
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == 'table' and name.startswith('tasks_fts'):
+        return False
+    if name in ('search_vector', 'ix_tasks_search_vector'):
+        return False
+    return True
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -47,6 +57,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=settings.DATABASE_URL,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -56,7 +67,7 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection: Connection) -> None:
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(connection=connection, target_metadata=target_metadata, include_object=include_object)
 
     with context.begin_transaction():
         context.run_migrations()
@@ -0,0 +1,45 @@
+"""Add task_stats table
+
+Revision ID: 136b48d91956
+Revises: 66d208570f75
+Create Date: 2026-10-18 14:02:37.508113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '136b48d91956'
+down_revision: Union[str, Sequence[str], None] = '66d208570f75'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('task_stats',
+    sa.Column('user_id', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('completed', sa.Boolean(), nullable=False),
+    # Reutiliza el tipo priorityenum que ya creó la tabla tasks
+    sa.Column('priority', postgresql.ENUM('URGENCIA', 'NECESIDAD', 'DEBER', 'PODER', name='priorityenum', create_type=False), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'completed', 'priority')
+    )
+    op.create_index('ix_tasks_user_id_completed_end_at', 'tasks', ['user_id', 'completed', 'end_at'], unique=False)
+    # Carga inicial desde las tareas existentes
+    op.execute(
+        "INSERT INTO task_stats (user_id, completed, priority, count) "
+        "SELECT user_id, completed, priority, COUNT(*) FROM tasks GROUP BY user_id, completed, priority"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_user_id_completed_end_at', table_name='tasks')
+    op.drop_table('task_stats')
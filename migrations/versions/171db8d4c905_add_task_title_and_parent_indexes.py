@@ -0,0 +1,32 @@
+"""Add task title uniqueness and parent indexes
+
+Revision ID: 171db8d4c905
+Revises: be183672d049
+Create Date: 2026-10-18 10:41:07.582113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '171db8d4c905'
+down_revision: Union[str, Sequence[str], None] = 'be183672d049'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Las búsquedas por user_id ya quedan cubiertas por los índices que empiezan por user_id
+    # (ix_tasks_user_id_title, ix_tasks_user_id_created_at_id), por eso no se crea uno aparte
+    op.create_index('ix_tasks_user_id_title', 'tasks', ['user_id', 'title'], unique=True)
+    op.create_index('ix_tasks_parent_id', 'tasks', ['parent_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_parent_id', table_name='tasks')
+    op.drop_index('ix_tasks_user_id_title', table_name='tasks')
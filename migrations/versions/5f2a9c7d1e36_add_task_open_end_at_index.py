@@ -0,0 +1,32 @@
+"""Add partial index on open task deadlines
+
+Revision ID: 5f2a9c7d1e36
+Revises: c0668305bc67
+Create Date: 2026-10-18 17:21:08.493617
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f2a9c7d1e36'
+down_revision: Union[str, Sequence[str], None] = 'c0668305bc67'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_tasks_open_end_at', 'tasks', ['end_at', 'id'], unique=False,
+        sqlite_where=sa.text('completed = 0 AND end_at IS NOT NULL'),
+        postgresql_where=sa.text('completed = false AND end_at IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_open_end_at', table_name='tasks')
@@ -0,0 +1,28 @@
+"""Add token_version to users
+
+Revision ID: 66d208570f75
+Revises: 171db8d4c905
+Create Date: 2026-10-18 13:05:22.914377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '66d208570f75'
+down_revision: Union[str, Sequence[str], None] = '171db8d4c905'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'token_version')
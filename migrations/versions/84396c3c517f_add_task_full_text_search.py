@@ -0,0 +1,85 @@
+"""Add task full-text search
+
+Revision ID: 84396c3c517f
+Revises: 136b48d91956
+Create Date: 2026-10-18 14:40:12.220913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '84396c3c517f'
+down_revision: Union[str, Sequence[str], None] = '136b48d91956'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        # tsvector mantenido por trigger (título con más peso que la descripción) e índice GIN
+        op.execute("ALTER TABLE tasks ADD COLUMN search_vector tsvector")
+        op.execute("""
+            CREATE FUNCTION tasks_search_vector_update() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector :=
+                    setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+                    setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'B');
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        op.execute("""
+            CREATE TRIGGER tasks_search_vector_trigger
+            BEFORE INSERT OR UPDATE OF title, description ON tasks
+            FOR EACH ROW EXECUTE FUNCTION tasks_search_vector_update()
+        """)
+        # El UPDATE dispara el trigger y rellena las filas existentes
+        op.execute("UPDATE tasks SET title = title")
+        op.create_index('ix_tasks_search_vector', 'tasks', ['search_vector'], postgresql_using='gin')
+        return
+
+    # SQLite: tabla FTS5 de contenido externo (no duplica el texto) sincronizada por triggers
+    op.execute("""
+        CREATE VIRTUAL TABLE tasks_fts USING fts5(
+            title, description, content='tasks', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    op.execute("""
+        CREATE TRIGGER tasks_fts_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO tasks_fts(rowid, title, description) VALUES (new.rowid, new.title, new.description);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER tasks_fts_delete AFTER DELETE ON tasks BEGIN
+            INSERT INTO tasks_fts(tasks_fts, rowid, title, description)
+            VALUES ('delete', old.rowid, old.title, old.description);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN
+            INSERT INTO tasks_fts(tasks_fts, rowid, title, description)
+            VALUES ('delete', old.rowid, old.title, old.description);
+            INSERT INTO tasks_fts(rowid, title, description) VALUES (new.rowid, new.title, new.description);
+        END
+    """)
+    op.execute("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_tasks_search_vector', table_name='tasks')
+        op.execute("DROP TRIGGER tasks_search_vector_trigger ON tasks")
+        op.execute("DROP FUNCTION tasks_search_vector_update()")
+        op.drop_column('tasks', 'search_vector')
+        return
+
+    op.execute("DROP TRIGGER tasks_fts_update")
+    op.execute("DROP TRIGGER tasks_fts_delete")
+    op.execute("DROP TRIGGER tasks_fts_insert")
+    op.execute("DROP TABLE tasks_fts")
@@ -0,0 +1,30 @@
+"""Add task parent filter index
+
+Revision ID: 9d41b6e2a7c8
+Revises: 5f2a9c7d1e36
+Create Date: 2026-10-18 19:02:41.385027
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d41b6e2a7c8'
+down_revision: Union[str, Sequence[str], None] = '5f2a9c7d1e36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_tasks_user_id_parent_id_created_at_id', 'tasks', ['user_id', 'parent_id', 'created_at', 'id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_user_id_parent_id_created_at_id', table_name='tasks')
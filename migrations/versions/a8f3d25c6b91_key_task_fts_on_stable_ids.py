@@ -0,0 +1,106 @@
+"""Key task full-text index on stable ids
+
+Revision ID: a8f3d25c6b91
+Revises: e3c7a1f9b254
+Create Date: 2026-10-18 19:41:56.208314
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8f3d25c6b91'
+down_revision: Union[str, Sequence[str], None] = 'e3c7a1f9b254'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Solo SQLite: en Postgres el índice es la columna search_vector de la propia fila
+    if op.get_bind().dialect.name == 'postgresql':
+        return
+
+    # El rowid implícito de tasks (clave primaria TEXT) no es estable: VACUUM puede renumerarlo y dejar
+    # tasks_fts apuntando a otras filas. tasks_fts pasa a ser una tabla sin contenido (content='') cuyo
+    # rowid es el de tasks_fts_ids, un INTEGER PRIMARY KEY (estable) asociado explícitamente a tasks.id
+    op.execute("DROP TRIGGER tasks_fts_update")
+    op.execute("DROP TRIGGER tasks_fts_delete")
+    op.execute("DROP TRIGGER tasks_fts_insert")
+    op.execute("DROP TABLE tasks_fts")
+
+    op.execute("CREATE TABLE tasks_fts_ids (id INTEGER PRIMARY KEY, task_id VARCHAR NOT NULL UNIQUE)")
+    op.execute("""
+        CREATE VIRTUAL TABLE tasks_fts USING fts5(
+            title, description, content='', tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    op.execute("""
+        CREATE TRIGGER tasks_fts_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO tasks_fts_ids (task_id) VALUES (new.id);
+            INSERT INTO tasks_fts (rowid, title, description)
+            SELECT id, new.title, new.description FROM tasks_fts_ids WHERE task_id = new.id;
+        END
+    """)
+    # Una tabla sin contenido borra con el comando 'delete' y los valores que se indexaron
+    op.execute("""
+        CREATE TRIGGER tasks_fts_delete AFTER DELETE ON tasks BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, title, description)
+            SELECT 'delete', id, old.title, old.description FROM tasks_fts_ids WHERE task_id = old.id;
+            DELETE FROM tasks_fts_ids WHERE task_id = old.id;
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, title, description)
+            SELECT 'delete', id, old.title, old.description FROM tasks_fts_ids WHERE task_id = old.id;
+            INSERT INTO tasks_fts (rowid, title, description)
+            SELECT id, new.title, new.description FROM tasks_fts_ids WHERE task_id = new.id;
+        END
+    """)
+    op.execute("INSERT INTO tasks_fts_ids (task_id) SELECT id FROM tasks")
+    op.execute("""
+        INSERT INTO tasks_fts (rowid, title, description)
+        SELECT tasks_fts_ids.id, tasks.title, tasks.description
+        FROM tasks JOIN tasks_fts_ids ON tasks_fts_ids.task_id = tasks.id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        return
+
+    op.execute("DROP TRIGGER tasks_fts_update")
+    op.execute("DROP TRIGGER tasks_fts_delete")
+    op.execute("DROP TRIGGER tasks_fts_insert")
+    op.execute("DROP TABLE tasks_fts")
+    op.execute("DROP TABLE tasks_fts_ids")
+
+    op.execute("""
+        CREATE VIRTUAL TABLE tasks_fts USING fts5(
+            title, description, content='tasks', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    op.execute("""
+        CREATE TRIGGER tasks_fts_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO tasks_fts(rowid, title, description) VALUES (new.rowid, new.title, new.description);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER tasks_fts_delete AFTER DELETE ON tasks BEGIN
+            INSERT INTO tasks_fts(tasks_fts, rowid, title, description)
+            VALUES ('delete', old.rowid, old.title, old.description);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN
+            INSERT INTO tasks_fts(tasks_fts, rowid, title, description)
+            VALUES ('delete', old.rowid, old.title, old.description);
+            INSERT INTO tasks_fts(rowid, title, description) VALUES (new.rowid, new.title, new.description);
+        END
+    """)
+    op.execute("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')")
@@ -0,0 +1,37 @@
+"""Add task priority_rank
+
+Revision ID: c0668305bc67
+Revises: ef9337c19141
+Create Date: 2026-10-18 16:04:55.172830
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c0668305bc67'
+down_revision: Union[str, Sequence[str], None] = 'ef9337c19141'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('tasks', sa.Column('priority_rank', sa.Integer(), server_default='3', nullable=False))
+    op.execute(
+        "UPDATE tasks SET priority_rank = CASE priority "
+        "WHEN 'URGENCIA' THEN 0 WHEN 'NECESIDAD' THEN 1 WHEN 'DEBER' THEN 2 ELSE 3 END"
+    )
+    op.create_index(
+        'ix_tasks_user_id_completed_priority_rank_end_at', 'tasks',
+        ['user_id', 'completed', 'priority_rank', sa.text('(end_at IS NULL)'), 'end_at', 'id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_user_id_completed_priority_rank_end_at', table_name='tasks')
+    op.drop_column('tasks', 'priority_rank')
@@ -0,0 +1,99 @@
+"""Maintain task_stats with triggers
+
+Revision ID: e3c7a1f9b254
+Revises: 9d41b6e2a7c8
+Create Date: 2026-10-18 19:20:13.642981
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3c7a1f9b254'
+down_revision: Union[str, Sequence[str], None] = '9d41b6e2a7c8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Los contadores se actualizan en el mismo statement que cambia la fila de tasks, con sus valores
+    # OLD/NEW reales: dos escrituras concurrentes sobre la misma tarea no pueden aplicar dos veces la misma
+    # transición, como pasaba al calcular los deltas en Python antes del UPDATE
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("""
+            CREATE FUNCTION task_stats_update() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                    UPDATE task_stats SET count = count - 1
+                    WHERE user_id = OLD.user_id AND completed = OLD.completed AND priority = OLD.priority;
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    INSERT INTO task_stats (user_id, completed, priority, count)
+                    VALUES (NEW.user_id, NEW.completed, NEW.priority, 1)
+                    ON CONFLICT (user_id, completed, priority) DO UPDATE SET count = task_stats.count + 1;
+                END IF;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        op.execute("""
+            CREATE TRIGGER task_stats_insert_delete AFTER INSERT OR DELETE ON tasks
+            FOR EACH ROW EXECUTE FUNCTION task_stats_update()
+        """)
+        op.execute("""
+            CREATE TRIGGER task_stats_update AFTER UPDATE OF user_id, completed, priority ON tasks
+            FOR EACH ROW
+            WHEN (OLD.user_id IS DISTINCT FROM NEW.user_id OR OLD.completed IS DISTINCT FROM NEW.completed
+                  OR OLD.priority IS DISTINCT FROM NEW.priority)
+            EXECUTE FUNCTION task_stats_update()
+        """)
+    else:
+        op.execute("""
+            CREATE TRIGGER task_stats_insert AFTER INSERT ON tasks BEGIN
+                INSERT INTO task_stats (user_id, completed, priority, count)
+                VALUES (new.user_id, new.completed, new.priority, 1)
+                ON CONFLICT (user_id, completed, priority) DO UPDATE SET count = count + 1;
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER task_stats_delete AFTER DELETE ON tasks BEGIN
+                UPDATE task_stats SET count = count - 1
+                WHERE user_id = old.user_id AND completed = old.completed AND priority = old.priority;
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER task_stats_update AFTER UPDATE OF user_id, completed, priority ON tasks
+            WHEN old.user_id IS NOT new.user_id OR old.completed IS NOT new.completed
+                 OR old.priority IS NOT new.priority
+            BEGIN
+                UPDATE task_stats SET count = count - 1
+                WHERE user_id = old.user_id AND completed = old.completed AND priority = old.priority;
+                INSERT INTO task_stats (user_id, completed, priority, count)
+                VALUES (new.user_id, new.completed, new.priority, 1)
+                ON CONFLICT (user_id, completed, priority) DO UPDATE SET count = count + 1;
+            END
+        """)
+
+    # Recuenta desde cero por si los contadores mantenidos hasta ahora se habían desviado
+    op.execute("DELETE FROM task_stats")
+    op.execute(
+        "INSERT INTO task_stats (user_id, completed, priority, count) "
+        "SELECT user_id, completed, priority, COUNT(*) FROM tasks GROUP BY user_id, completed, priority"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("DROP TRIGGER task_stats_update ON tasks")
+        op.execute("DROP TRIGGER task_stats_insert_delete ON tasks")
+        op.execute("DROP FUNCTION task_stats_update()")
+        return
+
+    op.execute("DROP TRIGGER task_stats_update")
+    op.execute("DROP TRIGGER task_stats_delete")
+    op.execute("DROP TRIGGER task_stats_insert")
@@ -0,0 +1,43 @@
+"""Add task filter indexes
+
+Revision ID: ef9337c19141
+Revises: 84396c3c517f
+Create Date: 2026-10-18 15:21:48.640219
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ef9337c19141'
+down_revision: Union[str, Sequence[str], None] = '84396c3c517f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Se añade id al índice de vencidas para que también sirva la paginación por (end_at, id)
+    op.drop_index('ix_tasks_user_id_completed_end_at', table_name='tasks')
+    op.create_index('ix_tasks_user_id_completed_end_at_id', 'tasks', ['user_id', 'completed', 'end_at', 'id'], unique=False)
+    op.create_index('ix_tasks_user_id_completed_created_at_id', 'tasks', ['user_id', 'completed', 'created_at', 'id'], unique=False)
+    op.create_index('ix_tasks_user_id_priority_created_at_id', 'tasks', ['user_id', 'priority', 'created_at', 'id'], unique=False)
+    op.create_index('ix_tasks_user_id_level_created_at_id', 'tasks', ['user_id', 'level', 'created_at', 'id'], unique=False)
+    op.create_index('ix_tasks_user_id_started_at_id', 'tasks', ['user_id', 'started_at', 'id'], unique=False)
+    op.create_index('ix_tasks_user_id_end_at_id', 'tasks', ['user_id', 'end_at', 'id'], unique=False)
+    op.create_index('ix_tasks_user_id_finished_at_id', 'tasks', ['user_id', 'finished_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_user_id_finished_at_id', table_name='tasks')
+    op.drop_index('ix_tasks_user_id_end_at_id', table_name='tasks')
+    op.drop_index('ix_tasks_user_id_started_at_id', table_name='tasks')
+    op.drop_index('ix_tasks_user_id_level_created_at_id', table_name='tasks')
+    op.drop_index('ix_tasks_user_id_priority_created_at_id', table_name='tasks')
+    op.drop_index('ix_tasks_user_id_completed_created_at_id', table_name='tasks')
+    op.drop_index('ix_tasks_user_id_completed_end_at_id', table_name='tasks')
+    op.create_index('ix_tasks_user_id_completed_end_at', 'tasks', ['user_id', 'completed', 'end_at'], unique=False)
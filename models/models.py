@@ -3,10 +3,10 @@ from datetime import datetime
 from enum import Enum
 from typing import Optional
 
-from passlib.context import CryptContext
+from sqlalchemy import Index, event, text
 from sqlmodel import Field, SQLModel, Relationship
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from config.hashing import pwd_context, password_hasher
 
 
 class PriorityEnum(str, Enum):
@@ -15,9 +15,29 @@ class PriorityEnum(str, Enum):
     DEBER = "DEBER"
     PODER = "PODER"
 
+    # Orden por urgencia (0 = más urgente); se guarda en tasks.priority_rank para poder ordenar con un índice
+    @property
+    def rank(self) -> int:
+        return PRIORITY_RANKS[self]
+
+
+PRIORITY_RANKS = {
+    PriorityEnum.URGENCIA: 0,
+    PriorityEnum.NECESIDAD: 1,
+    PriorityEnum.DEBER: 2,
+    PriorityEnum.PODER: 3,
+}
+
 
 class User(SQLModel, table=True):
     __tablename__ = "users"
+    # Los valores que genere la base (server_default, onupdate) vuelven en el mismo INSERT/UPDATE
+    # con RETURNING cuando el motor lo soporta, en lugar de con un SELECT posterior
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        # Clave de la paginación por cursor
+        Index('ix_users_created_at_id', 'created_at', 'id'),
+    )
 
     id: str = Field(default_factory=lambda: secrets.token_urlsafe(8)[:8], primary_key=True)
     first_names: str = Field(nullable=False, min_length=3, max_length=64)
@@ -31,6 +51,8 @@ class User(SQLModel, table=True):
     password: str = Field(nullable=False, min_length=8)
     is_active: bool = Field(nullable=False, default=True)
     is_admin: bool = Field(nullable=False, default=False)
+    # Se incrementa al cambiar credenciales o permisos; invalida los tokens emitidos antes
+    token_version: int = Field(nullable=False, default=0, sa_column_kwargs={"server_default": "0"})
 
     created_at: Optional[datetime] = Field(
         default_factory=lambda: datetime.now()
@@ -49,18 +71,56 @@ class User(SQLModel, table=True):
     def check_password(self, password: str) -> bool:
         return pwd_context.verify(password, self.password)
 
+    # Versiones async: el hash se calcula en el pool de config.hashing sin bloquear el event loop
+    async def aset_password(self, password: str) -> None:
+        self.password = await password_hasher.hash(password)
+
+    async def acheck_password(self, password: str) -> bool:
+        return await password_hasher.verify(password, self.password)
+
     def __repr__(self):
         return f'<User(email={self.email}, first_name={self.first_names}, last_name={self.last_names})>'
 
 
 class Task(SQLModel, table=True):
     __tablename__ = "tasks"
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        # Claves de la paginación por cursor (global y por usuario)
+        Index('ix_tasks_created_at_id', 'created_at', 'id'),
+        Index('ix_tasks_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+        # Un usuario no puede repetir títulos; también sirve las búsquedas por (user_id, title)
+        Index('ix_tasks_user_id_title', 'user_id', 'title', unique=True),
+        # Carga de subtareas
+        Index('ix_tasks_parent_id', 'parent_id'),
+        # Conteo de tareas vencidas (sin completar y con end_at pasado) de un usuario
+        # y listado filtrado (ver FILTER_INDEXES en repositories/task_repo.py)
+        Index('ix_tasks_user_id_completed_end_at_id', 'user_id', 'completed', 'end_at', 'id'),
+        Index('ix_tasks_user_id_completed_created_at_id', 'user_id', 'completed', 'created_at', 'id'),
+        Index('ix_tasks_user_id_priority_created_at_id', 'user_id', 'priority', 'created_at', 'id'),
+        Index('ix_tasks_user_id_level_created_at_id', 'user_id', 'level', 'created_at', 'id'),
+        Index('ix_tasks_user_id_parent_id_created_at_id', 'user_id', 'parent_id', 'created_at', 'id'),
+        Index('ix_tasks_user_id_started_at_id', 'user_id', 'started_at', 'id'),
+        Index('ix_tasks_user_id_end_at_id', 'user_id', 'end_at', 'id'),
+        Index('ix_tasks_user_id_finished_at_id', 'user_id', 'finished_at', 'id'),
+        # Próximas tareas: abiertas por (priority_rank, end_at), con las que no tienen end_at al final
+        # de cada prioridad en ambos motores (SQLite ordena los NULL primero y Postgres al final)
+        Index('ix_tasks_user_id_completed_priority_rank_end_at', 'user_id', 'completed', 'priority_rank',
+              text('(end_at IS NULL)'), 'end_at', 'id'),
+        # Carga inicial del planificador de vencimientos: solo las tareas abiertas con fecha límite.
+        # La condición se escribe como la compila cada motor para que el planificador reconozca el índice
+        Index('ix_tasks_open_end_at', 'end_at', 'id',
+              sqlite_where=text('completed = 0 AND end_at IS NOT NULL'),
+              postgresql_where=text('completed = false AND end_at IS NOT NULL')),
+    )
 
     id: str = Field(default_factory=lambda: secrets.token_urlsafe(8)[:8], primary_key=True)
     title: str = Field(min_length=5, max_length=100)
     description: Optional[str] = Field(max_length=256)
     completed: bool = Field(default=False)
     priority: PriorityEnum = Field(default=PriorityEnum.PODER)
+    # Derivado de priority: lo mantienen los eventos de abajo (ORM) y TaskRepository (INSERT/UPDATE de Core)
+    priority_rank: int = Field(default=PriorityEnum.PODER.rank, nullable=False, sa_column_kwargs={"server_default": "3"})
     started_at: Optional[datetime] = Field(default_factory=lambda: datetime.now())
     end_at: Optional[datetime] = None
     finished_at: Optional[datetime] = None
@@ -94,3 +154,23 @@ class Task(SQLModel, table=True):
 
     def __repr__(self):
         return f'<Task(title={self.title}, completed={self.completed}, priority={self.priority})>'
+
+
+@event.listens_for(Task, 'before_insert')
+@event.listens_for(Task, 'before_update')
+def _sync_priority_rank(mapper, connection, task: Task) -> None:
+    task.priority_rank = PriorityEnum(task.priority).rank
+
+
+# Contadores de tareas por (usuario, completada, prioridad), mantenidos por los triggers sobre tasks de la
+# migración e3c7a1f9b254 en la misma sentencia que cada escritura. Se pueden recalcular con
+# `python manage.py rebuild-task-stats`. Un esquema creado con SQLModel.metadata.create_all (sin Alembic)
+# no tiene esos triggers ni el índice de búsqueda tasks_fts: ahí las estadísticas quedan en cero y la
+# búsqueda de texto falla
+class TaskStats(SQLModel, table=True):
+    __tablename__ = "task_stats"
+
+    user_id: str = Field(foreign_key="users.id", primary_key=True)
+    completed: bool = Field(primary_key=True)
+    priority: PriorityEnum = Field(primary_key=True)
+    count: int = Field(default=0, nullable=False)
@@ -1,5 +1,11 @@
-from typing import TypeVar, Type, Optional, List, Generic, cast
+import base64
+import binascii
+import json
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import TypeVar, Type, Optional, List, Generic, Tuple, Iterable, Set, AsyncIterator, cast
 
+from sqlalchemy import Row, func, insert, tuple_, update
 from sqlalchemy.exc import NoResultFound, SQLAlchemyError, IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import SQLModel, select
@@ -7,11 +13,90 @@ from sqlmodel import SQLModel, select
 Modeltype = TypeVar("Modeltype", bound=SQLModel)
 
 
+# El cursor es opaco para el cliente: codifica la clave (created_at, id) de la última fila devuelta
+def encode_cursor(created_at: datetime, obj_id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), obj_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, obj_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(obj_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+# Unidad de trabajo: mientras está abierta, los repositorios que comparten la sesión solo hacen flush()
+# y el commit (o el rollback, si algo falla) se hace una sola vez al salir.
+# Se puede anidar; solo la unidad más externa confirma la transacción
+@asynccontextmanager
+async def unit_of_work(session: AsyncSession) -> AsyncIterator[AsyncSession]:
+    depth = session.info.get('unit_of_work', 0)
+    session.info['unit_of_work'] = depth + 1
+    try:
+        yield session
+        if depth == 0:
+            await session.commit()
+    except BaseException:
+        if depth == 0:
+            await session.rollback()
+        raise
+    finally:
+        session.info['unit_of_work'] = depth
+
+
 class BaseRepository(Generic[Modeltype]):
     def __init__(self, session: AsyncSession, model: Type[Modeltype]):
         self.session = session
         self.model = model
 
+    @property
+    def in_unit_of_work(self) -> bool:
+        return self.session.info.get('unit_of_work', 0) > 0
+
+    # Fuera de una unidad de trabajo cada escritura se confirma sola (comportamiento por defecto);
+    # dentro, basta con flush(). En ningún caso hace falta un refresh posterior: los valores por defecto
+    # del modelo se calculan en Python, los de la base vuelven con RETURNING (eager_defaults) y la
+    # sesión no expira los objetos al confirmar (expire_on_commit=False)
+    async def _commit(self) -> None:
+        if self.in_unit_of_work:
+            await self.session.flush()
+            return
+        await self.session.commit()
+
+    # Termina la transacción de lectura en curso y devuelve la conexión al pool antes de esperar un trabajo
+    # lento que no usa la base (p. ej. el hash de una contraseña); la siguiente consulta toma otra.
+    # Los objetos cargados siguen siendo válidos (expire_on_commit=False). Dentro de una unidad de trabajo no hace nada
+    async def release_connection(self) -> None:
+        if not self.in_unit_of_work:
+            await self.session.commit()
+
+    async def _rollback(self) -> None:
+        # Dentro de una unidad de trabajo el rollback lo hace ella, para toda la operación
+        if not self.in_unit_of_work:
+            await self.session.rollback()
+
+    # Hooks para mantener datos derivados (p. ej. contadores) en la misma transacción que la escritura.
+    # Se llaman antes de ejecutarla, así que todavía pueden leer los valores anteriores; por defecto no hacen nada
+    async def before_insert(self, objs: List[Modeltype]) -> None:
+        pass
+
+    async def before_update(self, obj: Modeltype) -> None:
+        pass
+
+    async def before_update_where(self, criteria: list, values: dict) -> None:
+        pass
+
+    async def before_delete(self, obj: Modeltype) -> None:
+        pass
+
+    # Opciones de carga (selectinload/joinedload) de las relaciones que se serializan en las respuestas.
+    # Con AsyncSession no hay lazy loading implícito, así que los repositorios que las necesiten las sobrescriben
+    def load_options(self) -> tuple:
+        return ()
+
     async def get_object_by_id(self, obj_id: str) -> Optional[Modeltype]:
         try:
             return await self.session.get(self.model, obj_id)
@@ -22,57 +107,174 @@ class BaseRepository(Generic[Modeltype]):
         except Exception as ex:
             raise ex
 
+    # Igual que get_object_by_id pero con las relaciones de load_options cargadas.
+    # populate_existing fuerza la carga aunque el objeto ya esté en la sesión
+    async def get_object_with_relations(self, obj_id: str) -> Optional[Modeltype]:
+        try:
+            return await self.session.get(
+                self.model, obj_id, options=self.load_options(), populate_existing=True
+            )
+        except SQLAlchemyError as ex:
+            raise ex
+
+    # Consultas de versión para los ETags: leen solo id/updated_at (o agregados), nunca el objeto completo
+    async def get_version_info(self, obj_id: str) -> Optional[Row]:
+        try:
+            statement = select(self.model.id, self.model.updated_at).where(self.model.id == obj_id)
+            result = await self.session.execute(statement)
+            return result.first()
+        except SQLAlchemyError as ex:
+            raise ex
+
+    async def get_collection_version(self, *criteria) -> Tuple[int, Optional[datetime]]:
+        try:
+            statement = select(func.count(self.model.id), func.max(self.model.updated_at)).where(*criteria)
+            result = await self.session.execute(statement)
+            count, last_updated = result.one()
+            return count, last_updated
+        except SQLAlchemyError as ex:
+            raise ex
+
+    async def get_existing_ids(self, obj_ids: Iterable[str]) -> Set[str]:
+        try:
+            statement = select(self.model.id).where(self.model.id.in_(set(obj_ids)))
+            result = await self.session.execute(statement)
+            return set(result.scalars().all())
+        except SQLAlchemyError as ex:
+            raise ex
+
     async def get_all(self, offset: int = 0, limit: int = 100) -> List[Modeltype]:
         try:
-            statement = select(self.model).offset(offset).limit(limit)
+            statement = select(self.model).options(*self.load_options()).offset(offset).limit(limit)
             result = await self.session.execute(statement)
             # Retorna explícitamente una lista
             return cast(List[Modeltype], result.scalars().all())
         except SQLAlchemyError as ex:
             raise ex
 
+    # Paginación por keyset: busca directamente en el índice (created_at, id) en lugar de
+    # recorrer y descartar `offset` filas, y no se desplaza si se insertan filas entre páginas
+    async def get_page(self, *criteria, cursor: Optional[str] = None,
+                       limit: int = 100) -> Tuple[List[Modeltype], Optional[str]]:
+        if limit < 1:
+            raise ValueError("The page limit must be at least 1.")
+        try:
+            statement = select(self.model).options(*self.load_options()).where(*criteria)
+            if cursor:
+                created_at, obj_id = decode_cursor(cursor)
+                statement = statement.where(
+                    tuple_(self.model.created_at, self.model.id) > tuple_(created_at, obj_id)
+                )
+            # Se pide una fila extra para saber si existe una página siguiente
+            statement = statement.order_by(self.model.created_at, self.model.id).limit(limit + 1)
+            result = await self.session.execute(statement)
+            objects = cast(List[Modeltype], result.scalars().all())
+        except SQLAlchemyError as ex:
+            raise ex
+
+        if len(objects) <= limit:
+            return objects, None
+        objects = objects[:limit]
+        return objects, encode_cursor(objects[-1].created_at, objects[-1].id)
+
     async def create(self, obj: Modeltype) -> Modeltype:
         try:
+            await self.before_insert([obj])
             self.session.add(obj)
-            await self.session.commit()
-            await self.session.refresh(obj)
+            await self._commit()
             return obj
         except IntegrityError as ex:
-            await self.session.rollback()
+            await self._rollback()
             raise ex
         except SQLAlchemyError as ex:
-            await self.session.rollback()
+            await self._rollback()
             raise ex
         except Exception as ex:
-            await self.session.rollback()
+            await self._rollback()
+            raise ex
+
+    # Inserción de muchas filas en una sola sentencia (executemany / INSERT multi-fila) y un solo commit.
+    # Se usa el INSERT de Core sobre la tabla: el bulk insert del ORM agrupa las filas según qué
+    # columnas son None y acaba emitiendo una sentencia por grupo
+    async def bulk_create(self, objs: List[Modeltype]) -> None:
+        try:
+            await self.before_insert(objs)
+            # Todas las filas deben tener las mismas claves para el executemany
+            columns = [column.name for column in self.model.__table__.columns]
+            rows = [{name: getattr(obj, name, None) for name in columns} for obj in objs]
+            await self.session.execute(insert(self.model.__table__), rows)
+            await self._commit()
+        except SQLAlchemyError as ex:
+            await self._rollback()
+            raise ex
+
+    # Un único UPDATE ... WHERE para todas las filas que cumplan los criterios.
+    # Devuelve las columnas pedidas de las filas afectadas con RETURNING cuando el motor lo soporta
+    # (Postgres, SQLite >= 3.35); si no, se seleccionan antes las filas afectadas por su id
+    async def bulk_update(self, criteria: list, values: dict, returning: tuple) -> List[dict]:
+        try:
+            await self.before_update_where(criteria, values)
+            if self.session.bind.dialect.update_returning:
+                statement = update(self.model).where(*criteria).values(**values).returning(*returning)
+                result = await self.session.execute(statement)
+                rows = [dict(row._mapping) for row in result.all()]
+            else:
+                ids = (await self.session.execute(select(self.model.id).where(*criteria))).scalars().all()
+                await self.session.execute(update(self.model).where(self.model.id.in_(ids)).values(**values))
+                result = await self.session.execute(select(*returning).where(self.model.id.in_(ids)))
+                rows = [dict(row._mapping) for row in result.all()]
+            await self._commit()
+            return rows
+        except SQLAlchemyError as ex:
+            await self._rollback()
+            raise ex
+
+    # UPDATE ... WHERE id = :id solo con las columnas indicadas, sin cargar antes la fila.
+    # Con RETURNING (Postgres, SQLite >= 3.35) la fila actualizada vuelve en la misma sentencia;
+    # si el objeto ya estaba en la sesión se actualiza en su lugar y conserva sus relaciones cargadas
+    async def update_by_id(self, obj_id: str, values: dict) -> Optional[Modeltype]:
+        try:
+            await self.before_update_where([self.model.id == obj_id], values)
+            statement = update(self.model).where(self.model.id == obj_id).values(**values)
+            if self.session.bind.dialect.update_returning:
+                statement = statement.returning(self.model)
+                obj = (await self.session.execute(statement)).scalars().first()
+            else:
+                result = await self.session.execute(statement)
+                obj = await self.session.get(self.model, obj_id, populate_existing=True) if result.rowcount else None
+            await self._commit()
+            return obj
+        except SQLAlchemyError as ex:
+            await self._rollback()
             raise ex
 
     # Aunque resulte repetitivo preferí separar create de update
     # a pesar de su similitud y de que SQLModel maneja upsert (actualiza si existe, crea si no)
     async def update(self, obj: Modeltype) -> Modeltype:
         try:
+            await self.before_update(obj)
             self.session.add(obj)
-            await self.session.commit()
-            await self.session.refresh(obj)
+            await self._commit()
             return obj
         except IntegrityError as ex:
-            await self.session.rollback()
+            await self._rollback()
             raise ex
         except SQLAlchemyError as ex:
-            await self.session.rollback()
+            await self._rollback()
             raise ex
         except Exception as ex:
-            await self.session.rollback()
+            await self._rollback()
             raise ex
 
     async def delete(self, obj: Modeltype) -> bool:
         try:
+            await self.before_delete(obj)
             await self.session.delete(obj)
-            await self.session.commit()
+            await self._commit()
             return True
         except SQLAlchemyError as ex:
-            await self.session.rollback()
+            await self._rollback()
             raise ex
         except Exception as ex:
-            await self.session.rollback()
+            await self._rollback()
             raise ex
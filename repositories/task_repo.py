@@ -1,20 +1,312 @@
-from typing import List, Optional, cast
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple, cast
 
+from sqlalchemy import Row, false, func, literal_column, text, tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, joinedload, selectinload
 from sqlmodel import select
 
-from models.models import Task
-from repositories.base_repo import BaseRepository
+from models.models import PriorityEnum, Task, User
+from repositories.base_repo import BaseRepository, decode_cursor, encode_cursor
+from repositories.task_stats_repo import TaskStatsRepository
+from schemas.schemas import TaskListQuery
+
+
+# Combinaciones de filtros por igualdad admitidas en filter_page -> columnas por las que se puede ordenar
+# (y filtrar por rango) con ellas. Cada entrada corresponde a un índice que empieza por user_id
+# (ver Task.__table_args__), así que la consulta siempre es un recorrido de un rango contiguo del índice
+FILTER_INDEXES = {
+    frozenset(): ('created_at', 'started_at', 'end_at', 'finished_at'),
+    frozenset({'completed'}): ('created_at', 'end_at'),
+    frozenset({'priority'}): ('created_at',),
+    frozenset({'level'}): ('created_at',),
+    frozenset({'parent_id'}): ('created_at',),
+}
+RANGE_FILTERS = {
+    'started_at': ('started_from', 'started_to'),
+    'end_at': ('end_from', 'end_to'),
+    'finished_at': ('finished_from', 'finished_to'),
+}
 
 
 class TaskRepository(BaseRepository[Task]):
     def __init__(self, session: AsyncSession):
         super().__init__(session, Task)
+        self.stats = TaskStatsRepository(session)
+
+    # Los contadores de task_stats los mantienen triggers sobre tasks (migración e3c7a1f9b254), con los
+    # valores OLD/NEW de cada fila en el mismo statement que la modifica; aquí solo se calcula priority_rank
+    async def before_insert(self, objs: List[Task]) -> None:
+        # bulk_create inserta con Core, sin pasar por los eventos del ORM que calculan priority_rank
+        for obj in objs:
+            obj.priority_rank = PriorityEnum(obj.priority).rank
+
+    async def before_update_where(self, criteria: list, values: dict) -> None:
+        # Igual que en before_insert: un UPDATE de Core debe escribir también priority_rank
+        if values.get('priority') is not None:
+            values['priority_rank'] = PriorityEnum(values['priority']).rank
+
+    # TaskResponse incluye el usuario y las subtareas: el usuario viene en el mismo SELECT (JOIN)
+    # y las subtareas de toda la página en un único SELECT ... WHERE parent_id IN (...)
+    def load_options(self) -> tuple:
+        return joinedload(Task.user), selectinload(Task.subtasks)
+
+    # Versión de todo lo que serializa TaskResponse: la tarea, su usuario y sus subtareas
+    # (el conteo detecta subtareas borradas). Las subtareas se buscan por ix_tasks_parent_id
+    async def get_version_info(self, obj_id: str) -> Optional[Row]:
+        subtask = aliased(Task)
+        statement = (
+            select(Task.id, Task.user_id, Task.updated_at, User.updated_at.label('user_updated_at'),
+                   func.count(subtask.id).label('subtasks'),
+                   func.max(subtask.updated_at).label('subtasks_updated_at'))
+            .outerjoin(User, User.id == Task.user_id)
+            .outerjoin(subtask, subtask.parent_id == Task.id)
+            .where(Task.id == obj_id)
+            .group_by(Task.id, Task.user_id, Task.updated_at, User.updated_at)
+        )
+        result = await self.session.execute(statement)
+        return result.first()
 
     async def get_task_by_user(self, user_id: str, offset: int = 0, limit: int = 100) -> List[Task]:
-        statement = select(Task).where(Task.user_id == user_id).offset(offset).limit(limit)
+        statement = (
+            select(Task)
+            .options(*self.load_options())
+            .where(Task.user_id == user_id)
+            .offset(offset)
+            .limit(limit)
+        )
+        result = await self.session.execute(statement)
+        return cast(List[Task], result.scalars().all())
+
+    # Compila TaskListQuery a un WHERE de igualdades + un rango sobre la columna de orden, con paginación
+    # por keyset sobre (columna de orden, id). Las combinaciones que no estén en FILTER_INDEXES se rechazan
+    # con ValueError en lugar de ejecutarse como un recorrido completo de las tareas del usuario
+    async def filter_page(self, user_id: str, query: TaskListQuery, cursor: Optional[str] = None,
+                          limit: int = 100) -> Tuple[List[Task], Optional[str]]:
+        if limit < 1:
+            raise ValueError("The page limit must be at least 1.")
+        filters = query.model_dump(exclude_none=True, include={'completed', 'priority', 'level', 'parent_id'})
+        ranges = {
+            column: (getattr(query, low), getattr(query, high))
+            for column, (low, high) in RANGE_FILTERS.items()
+            if getattr(query, low) is not None or getattr(query, high) is not None
+        }
+        if len(ranges) > 1:
+            raise ValueError("Only one date range can be filtered at a time.")
+        sort = query.sort or next(iter(ranges), 'created_at')
+        if ranges and sort not in ranges:
+            raise ValueError(f"A date range filter requires sorting by that column ({next(iter(ranges))}).")
+
+        allowed = FILTER_INDEXES.get(frozenset(filters))
+        if allowed is None or sort not in allowed:
+            supported = '; '.join(
+                f"{' + '.join(sorted(combination)) or 'no filters'}: sort by {', '.join(columns)}"
+                for combination, columns in FILTER_INDEXES.items()
+            )
+            raise ValueError(f"Unsupported filter/sort combination. Supported: {supported}.")
+
+        sort_column = getattr(Task, sort)
+        criteria = [Task.user_id == user_id, *(getattr(Task, key) == value for key, value in filters.items())]
+        if sort != 'created_at':
+            criteria.append(sort_column.is_not(None))
+        for low, high in ranges.values():
+            if low is not None:
+                criteria.append(sort_column >= low)
+            if high is not None:
+                criteria.append(sort_column < high)
+
+        descending = query.order == 'desc'
+        if cursor:
+            sort_value, obj_id = decode_cursor(cursor)
+            key, after = tuple_(sort_column, Task.id), tuple_(sort_value, obj_id)
+            criteria.append(key < after if descending else key > after)
+        order_by = (sort_column.desc(), Task.id.desc()) if descending else (sort_column, Task.id)
+
+        statement = select(Task).options(*self.load_options()).where(*criteria).order_by(*order_by).limit(limit + 1)
+        result = await self.session.execute(statement)
+        tasks = cast(List[Task], result.scalars().all())
+        if len(tasks) <= limit:
+            return tasks, None
+        tasks = tasks[:limit]
+        return tasks, encode_cursor(getattr(tasks[-1], sort), tasks[-1].id)
+
+    async def get_task_page_by_user(self, user_id: str, cursor: Optional[str] = None,
+                                    limit: int = 100) -> Tuple[List[Task], Optional[str]]:
+        return await self.get_page(Task.user_id == user_id, cursor=cursor, limit=limit)
+
+    # Recorre las tareas del usuario con un cursor del lado del servidor (yield_per),
+    # sin cargar nunca más de batch_size filas en memoria
+    async def stream_by_user(self, user_id: str, batch_size: int = 1000) -> AsyncIterator[Task]:
+        statement = (
+            select(Task)
+            .where(Task.user_id == user_id)
+            .order_by(Task.created_at, Task.id)
+            .execution_options(yield_per=batch_size)
+        )
+        result = await self.session.stream_scalars(statement)
+        async for task in result:
+            yield task
+
+    # Toda la subtarea (raíz incluida) en una sola consulta con un CTE recursivo.
+    # UNION en lugar de UNION ALL para que un ciclo accidental en parent_id no lo haga infinito
+    async def get_subtree(self, task_id: str) -> List[Task]:
+        tree = select(Task.id).where(Task.id == task_id).cte(name='task_tree', recursive=True)
+        tree = tree.union(select(Task.id).where(Task.parent_id == tree.c.id))
+        statement = select(Task).join(tree, Task.id == tree.c.id)
+        result = await self.session.execute(statement)
+        return cast(List[Task], result.scalars().all())
+
+    # Descendientes de las tareas que cumplen criteria -> profundidad bajo ellas (1 = subtarea directa), para
+    # validar un cambio de padre. No se baja por las tareas que también cumplen criteria: se mueven con su propio
+    # subárbol. El límite de profundidad corta un ciclo accidental en parent_id
+    async def get_descendant_depths(self, criteria: list) -> Dict[str, int]:
+        child = aliased(Task)
+        selected = select(Task.id).where(*criteria)
+        tree = (
+            select(Task.id, literal_column('0').label('depth')).where(*criteria)
+            .cte(name='task_tree', recursive=True)
+        )
+        tree = tree.union_all(
+            select(child.id, tree.c.depth + 1)
+            .where(child.parent_id == tree.c.id, child.id.not_in(selected), tree.c.depth < 3)
+        )
+        statement = select(tree.c.id, func.max(tree.c.depth)).where(tree.c.depth > 0).group_by(tree.c.id)
+        result = await self.session.execute(statement)
+        return {task_id: depth for task_id, depth in result.all()}
+
+    # Tras mover las tareas task_ids (con su level ya actualizado), recalcula en un solo UPDATE el level
+    # de todos sus descendientes a partir del suyo
+    async def relevel_descendants(self, task_ids: Iterable[str]) -> None:
+        task_ids = set(task_ids)
+        if not task_ids:
+            return
+        child = aliased(Task)
+        tree = select(Task.id, Task.level).where(Task.id.in_(task_ids)).cte(name='task_tree', recursive=True)
+        tree = tree.union_all(
+            select(child.id, tree.c.level + 1).where(child.parent_id == tree.c.id, tree.c.level < 3)
+        )
+        new_level = select(tree.c.level).where(tree.c.id == Task.id).scalar_subquery()
+        statement = (
+            update(Task)
+            .where(Task.id.in_(select(tree.c.id)), Task.id.not_in(task_ids))
+            .values(level=new_level)
+        )
+        await self.session.execute(statement)
+        await self._commit()
+
+    # (user_id, level) de cada tarea encontrada, para validar padres de un lote con una sola consulta
+    async def get_parent_info(self, task_ids: Iterable[str]) -> Dict[str, Tuple[str, int]]:
+        statement = select(Task.id, Task.user_id, Task.level).where(Task.id.in_(set(task_ids)))
+        result = await self.session.execute(statement)
+        return {task_id: (user_id, level) for task_id, user_id, level in result.all()}
+
+    # SQLite no busca por el índice con (user_id, title) IN (VALUES ...) sino que lo recorre entero; con dos
+    # IN separados sí usa ix_tasks_user_id_title, y los pares que sobran del producto se descartan aquí
+    async def get_existing_titles(self, user_titles: Iterable[Tuple[str, str]]) -> Set[Tuple[str, str]]:
+        pairs = set(user_titles)
+        statement = select(Task.user_id, Task.title).where(
+            Task.user_id.in_({user_id for user_id, _ in pairs}),
+            Task.title.in_({title for _, title in pairs}),
+        )
+        result = await self.session.execute(statement)
+        return {(user_id, title) for user_id, title in result.all() if (user_id, title) in pairs}
+
+    # Tareas abiertas del usuario por urgencia y fecha límite (las que no tienen end_at van al final de su
+    # prioridad). El ORDER BY coincide con ix_tasks_user_id_completed_priority_rank_end_at, así que es
+    # un único recorrido del índice que se detiene en `limit` filas
+    async def get_next_by_user(self, user_id: str, limit: int = 10) -> List[Task]:
+        statement = (
+            select(Task)
+            .options(*self.load_options())
+            .where(Task.user_id == user_id, Task.completed == false())
+            .order_by(Task.priority_rank, Task.end_at.is_(None), Task.end_at, Task.id)
+            .limit(limit)
+        )
+        result = await self.session.execute(statement)
+        return cast(List[Task], result.scalars().all())
+
+    # Recorre solo el rango (user_id, completed=False, end_at < now) de ix_tasks_user_id_completed_end_at_id
+    async def count_overdue(self, user_id: str, now: datetime) -> int:
+        statement = select(func.count()).select_from(Task).where(
+            Task.user_id == user_id, Task.completed == false(), Task.end_at < now
+        )
+        result = await self.session.execute(statement)
+        return result.scalar_one()
+
+    # Vencidas del usuario, de la más antigua a la más reciente, por el mismo rango del índice
+    async def get_overdue_by_user(self, user_id: str, now: datetime, limit: int = 100) -> List[Task]:
+        statement = (
+            select(Task)
+            .options(*self.load_options())
+            .where(Task.user_id == user_id, Task.completed == false(), Task.end_at < now)
+            .order_by(Task.end_at, Task.id)
+            .limit(limit)
+        )
         result = await self.session.execute(statement)
-        return cast(List[Task], result.scalars().first())
+        return cast(List[Task], result.scalars().all())
+
+    # (id, user_id, end_at) de las tareas abiertas que vencen después de `after`, en orden de vencimiento.
+    # Recorre el índice parcial ix_tasks_open_end_at, que solo contiene tareas abiertas con fecha límite
+    async def stream_open_deadlines(self, after: datetime,
+                                    batch_size: int = 1000) -> AsyncIterator[Tuple[str, str, datetime]]:
+        statement = (
+            select(Task.id, Task.user_id, Task.end_at)
+            .where(Task.completed == false(), Task.end_at.is_not(None), Task.end_at > after)
+            .order_by(Task.end_at, Task.id)
+            .execution_options(yield_per=batch_size)
+        )
+        result = await self.session.stream(statement)
+        async for task_id, user_id, end_at in result:
+            yield task_id, user_id, end_at
+
+    # De las tareas indicadas, las que siguen abiertas y con end_at <= now según la base
+    async def get_overdue_deadlines(self, task_ids: Iterable[str], now: datetime) -> List[Tuple[str, str, datetime]]:
+        statement = select(Task.id, Task.user_id, Task.end_at).where(
+            Task.id.in_(set(task_ids)), Task.completed == false(), Task.end_at <= now
+        )
+        result = await self.session.execute(statement)
+        return [(task_id, user_id, end_at) for task_id, user_id, end_at in result.all()]
+
+    # Búsqueda de texto sobre título y descripción, ordenada por relevancia. Usa el índice FTS5 (SQLite)
+    # o el tsvector con índice GIN (Postgres) que mantienen los triggers de las migraciones 84396c3c517f
+    # y a8f3d25c6b91 (en SQLite, tasks_fts_ids asocia el rowid del índice con tasks.id).
+    # Todos los términos deben aparecer, como prefijo; cada término es una palabra (\w+), así que
+    # pueden interpolarse en la sintaxis de consulta de cada motor sin riesgo
+    async def search(self, terms: List[str], user_id: Optional[str] = None,
+                     offset: int = 0, limit: int = 20) -> List[Task]:
+        params = {'limit': limit, 'offset': offset}
+        user_filter = ''
+        if user_id is not None:
+            user_filter = 'AND tasks.user_id = :user_id'
+            params['user_id'] = user_id
+
+        if self.session.bind.dialect.name == 'postgresql':
+            params['query'] = ' & '.join(f'{term}:*' for term in terms)
+            statement = text(f"""
+                SELECT tasks.id FROM tasks, to_tsquery('simple', :query) AS query
+                WHERE tasks.search_vector @@ query {user_filter}
+                ORDER BY ts_rank(tasks.search_vector, query) DESC, tasks.id
+                LIMIT :limit OFFSET :offset
+            """)
+        else:
+            params['query'] = ' '.join(f'"{term}"*' for term in terms)
+            # bm25 devuelve valores más bajos cuanto más relevante; el título pesa más que la descripción
+            statement = text(f"""
+                SELECT tasks.id FROM tasks_fts
+                JOIN tasks_fts_ids ON tasks_fts_ids.id = tasks_fts.rowid
+                JOIN tasks ON tasks.id = tasks_fts_ids.task_id
+                WHERE tasks_fts MATCH :query {user_filter}
+                ORDER BY bm25(tasks_fts, 10.0, 1.0), tasks.id
+                LIMIT :limit OFFSET :offset
+            """)
+
+        ids = (await self.session.execute(statement, params)).scalars().all()
+        if not ids:
+            return []
+        # Las tareas se cargan con sus relaciones y se devuelven en el orden de relevancia
+        result = await self.session.execute(select(Task).options(*self.load_options()).where(Task.id.in_(ids)))
+        tasks = {task.id: task for task in result.scalars().all()}
+        return [tasks[task_id] for task_id in ids if task_id in tasks]
 
     async def get_task_by_title(self, title: str, user_id: str) -> Optional[Task]:
         statement = select(Task).where(Task.title == title, Task.user_id == user_id)
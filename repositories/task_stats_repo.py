@@ -0,0 +1,46 @@
+from typing import List, Optional, cast
+
+from sqlalchemy import delete, func, insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from models.models import Task, TaskStats
+
+
+# Los contadores los mantienen triggers sobre tasks (ver la migración e3c7a1f9b254);
+# este repositorio solo los lee, los borra con el usuario y los recalcula si hiciera falta
+class TaskStatsRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    # Las filas del usuario (aunque estén a 0) se borran junto con él por la clave foránea
+    async def delete_by_user(self, user_id: str) -> None:
+        try:
+            await self.session.execute(delete(TaskStats).where(TaskStats.user_id == user_id))
+        except SQLAlchemyError as ex:
+            raise ex
+
+    async def get_by_user(self, user_id: str) -> List[TaskStats]:
+        statement = select(TaskStats).where(TaskStats.user_id == user_id, TaskStats.count > 0)
+        result = await self.session.execute(statement)
+        return cast(List[TaskStats], result.scalars().all())
+
+    # Recalcula los contadores desde tasks con una sola consulta de agregación
+    async def rebuild(self, user_id: Optional[str] = None) -> None:
+        criteria = [TaskStats.user_id == user_id] if user_id else []
+        task_criteria = [Task.user_id == user_id] if user_id else []
+        aggregate = (
+            select(Task.user_id, Task.completed, Task.priority, func.count())
+            .where(*task_criteria)
+            .group_by(Task.user_id, Task.completed, Task.priority)
+        )
+        try:
+            await self.session.execute(delete(TaskStats).where(*criteria))
+            await self.session.execute(
+                insert(TaskStats).from_select(['user_id', 'completed', 'priority', 'count'], aggregate)
+            )
+            await self.session.commit()
+        except SQLAlchemyError as ex:
+            await self.session.rollback()
+            raise ex
@@ -6,12 +6,16 @@ from sqlmodel import select
 
 from models.models import User
 from repositories.base_repo import BaseRepository
+from repositories.task_stats_repo import TaskStatsRepository
 
 
 class UserRepository(BaseRepository[User]):
     def __init__(self, session: AsyncSession):
         super().__init__(session, User)
 
+    async def before_delete(self, obj: User) -> None:
+        await TaskStatsRepository(self.session).delete_by_user(obj.id)
+
     async def get_user_by_email(self, email: EmailStr) -> Optional[User]:
         statement = select(User).where(User.email == email)
         result = await self.session.execute(statement)
@@ -5,7 +5,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from config.dependencies import get_session
 from config.dependencies import get_auth_service
-from config.security import create_token
+from config.security import create_token, token_claims, ALGORITHM
 from config.settings import settings
 from repositories.user_repo import UserRepository
 from schemas.schemas import Token
@@ -19,8 +19,9 @@ async def login(email: str, password: str, auth_service: AuthService = Depends(g
     if not user:
         raise HTTPException(status_code=404, detail="Incorrect email or password", headers={"WWW-Authenticate": "Bearer"})
 
-    access_token = create_token(token_type='access', data={"sub": user.email})
-    ref_token = create_token(token_type='refresh', data={"sub": user.email})
+    claims = token_claims(user)
+    access_token = create_token(token_type='access', data=claims)
+    ref_token = create_token(token_type='refresh', data=claims)
 
     return {
         "access_token": access_token,
@@ -41,7 +42,7 @@ async def refresh_token(
     )
 
     try:
-        payload = jwt.decode(ref_token, settings.SECRET_KEY, algorithms=["HS256"])
+        payload = jwt.decode(ref_token, settings.SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
@@ -52,8 +53,11 @@ async def refresh_token(
     user = await user_repo.get_user_by_email(email)
     if user is None or not user.is_active:
         raise credentials_exception
+    # Los refresh tokens también quedan revocados al subir la versión de token del usuario
+    if "ver" in payload and payload["ver"] != user.token_version:
+        raise credentials_exception
 
-    access_token = create_token(token_type='access', data={"sub": user.email})
+    access_token = create_token(token_type='access', data=token_claims(user))
 
     return {
         "access_token": access_token,
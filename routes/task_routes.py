@@ -1,17 +1,28 @@
-from fastapi import Depends, APIRouter, HTTPException, status
+from typing import List, Optional
+
+from fastapi import Depends, APIRouter, HTTPException, Path, Query, Request, status
 from sqlalchemy.exc import IntegrityError
 from starlette.responses import Response
 
-from config.dependencies import is_owner_or_admin_task, get_task_service, admin_required
-from models.models import User
-from schemas.schemas import TaskResponse, TaskCreate, TaskUpdate
-from services.task_service import TaskService
+from config.dependencies import is_owner_or_admin_task, get_task_service, admin_required, is_owner_or_admin_user, \
+    get_current_user, get_authorized_task, get_authorized_task_version, get_read_task_service
+from config.etag import Version, conditional_response
+from config.serialization import json_response
+from config.settings import settings
+from models.models import Task, User
+from schemas.schemas import TaskResponse, TaskCreate, TaskUpdate, TaskPage, TaskTreeResponse, TaskBulkCreateResult, \
+    TaskBulkUpdate, TaskBulkUpdateResult, TaskImportResult, TaskSearchPage, TaskListQuery, task_list_adapter, task_page_adapter, \
+    task_search_adapter
+from services.task_service import TaskService, iter_lines
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
 
 @router.post('/create', response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
-async def create(task_data: TaskCreate, task_service: TaskService = Depends(get_task_service)):
+async def create(task_data: TaskCreate, task_service: TaskService = Depends(get_task_service),
+                 current_user: User = Depends(get_current_user)):
+    if not current_user.is_admin and task_data.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are not the owner of this user account.")
     try:
         return await task_service.create(task_data)
     except IntegrityError as e:
@@ -22,39 +33,168 @@ async def create(task_data: TaskCreate, task_service: TaskService = Depends(get_
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get('/{task_id}', response_model=TaskResponse, status_code=status.HTTP_200_OK)
-async def get(task_id: str, task_service: TaskService = Depends(get_task_service),
-              current_user: User = Depends(is_owner_or_admin_task)):
-    task = await task_service.get_by_id(task_id)
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-    return task
+# Crea muchas tareas en una sola transacción; los elementos inválidos se informan por índice
+@router.post('/bulk', response_model=TaskBulkCreateResult, status_code=status.HTTP_200_OK)
+async def bulk_create(tasks_data: List[TaskCreate], task_service: TaskService = Depends(get_task_service),
+                      current_user: User = Depends(get_current_user)):
+    try:
+        owner_id = None if current_user.is_admin else current_user.id
+        return await task_service.bulk_create(tasks_data, owner_id=owner_id)
+    except IntegrityError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# Importación en streaming: el cuerpo es NDJSON (un TaskCreate por línea) y se procesa por bloques
+@router.post('/import', response_model=TaskImportResult, status_code=status.HTTP_200_OK)
+async def import_tasks(request: Request,
+                       chunk_size: int = Query(settings.TASK_IMPORT_CHUNK_SIZE, ge=1, le=settings.TASK_BULK_MAX_ITEMS),
+                       task_service: TaskService = Depends(get_task_service),
+                       current_user: User = Depends(get_current_user)):
+    owner_id = None if current_user.is_admin else current_user.id
+    return await task_service.import_ndjson(iter_lines(request.stream()), owner_id=owner_id, chunk_size=chunk_size)
+
+
+# Debe declararse antes de PATCH /{task_id} para que 'bulk' no se tome como un id
+@router.patch('/bulk', response_model=TaskBulkUpdateResult, status_code=status.HTTP_200_OK)
+async def bulk_patch(bulk_data: TaskBulkUpdate, task_service: TaskService = Depends(get_task_service),
+                     current_user: User = Depends(get_current_user)):
+    try:
+        owner_id = None if current_user.is_admin else current_user.id
+        return await task_service.bulk_patch(bulk_data, owner_id=owner_id)
+    except IntegrityError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# Búsqueda de texto en título y descripción. Debe declararse antes de GET /{task_id}.
+# Un usuario solo busca en sus tareas; un administrador en todas o en las de user_id
+@router.get('/search', response_model=TaskSearchPage, status_code=status.HTTP_200_OK)
+async def search(q: str = Query(..., min_length=1, max_length=256), user_id: Optional[str] = None,
+                 limit: int = Query(20, ge=1, le=100), offset: int = Query(0, ge=0),
+                 task_service: TaskService = Depends(get_read_task_service),
+                 current_user: User = Depends(get_current_user)):
+    if not current_user.is_admin:
+        if user_id is not None and user_id != current_user.id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are not the owner of this user account.")
+        user_id = current_user.id
+    try:
+        tasks, next_offset = await task_service.search(q, user_id=user_id, offset=offset, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return json_response(task_search_adapter, {"items": tasks, "next_offset": next_offset})
 
 
-@router.get('/limit={limit}/offset={offset}', status_code=status.HTTP_200_OK)
-async def get_all(limit: int = 100, offset: int = 0, task_service: TaskService = Depends(get_task_service),
+# Los listados deben declararse antes de GET /{task_id}: si no, /limit=10 se tomaría como un id
+@router.get('/limit={limit}/offset={offset}', response_model=List[TaskResponse], status_code=status.HTTP_200_OK)
+async def get_all(request: Request, response: Response, limit: int = Path(..., ge=1, le=settings.PAGE_MAX_LIMIT),
+                  offset: int = Path(..., ge=0), task_service: TaskService = Depends(get_read_task_service),
                   current_user: User = Depends(admin_required)):
+    version = await task_service.get_collection_version(request.url.path, request.url.query)
+    not_modified = conditional_response(request, response, version)
+    if not_modified:
+        return not_modified
     tasks = await task_service.get_all(limit=limit, offset=offset)
     if not tasks:
         raise HTTPException(status_code=404, detail="No tasks found")
-    return tasks
-
-
-@router.get('/user={user_id}/limit={limit}/offset={offset}', status_code=status.HTTP_200_OK)
-async def get_all_by_user(user_id: str, limit: int = 100, offset: int = 0,
-                          task_service: TaskService = Depends(get_task_service),
-                          current_user: User = Depends(is_owner_or_admin_task)):
+    return json_response(task_list_adapter, tasks, response)
+
+
+@router.get('/user={user_id}/limit={limit}/offset={offset}', response_model=List[TaskResponse], status_code=status.HTTP_200_OK)
+async def get_all_by_user(user_id: str, request: Request, response: Response,
+                          limit: int = Path(..., ge=1, le=settings.PAGE_MAX_LIMIT), offset: int = Path(..., ge=0),
+                          task_service: TaskService = Depends(get_read_task_service),
+                          current_user: User = Depends(is_owner_or_admin_user)):
+    version = await task_service.get_collection_version(request.url.path, request.url.query, user_id=user_id)
+    not_modified = conditional_response(request, response, version)
+    if not_modified:
+        return not_modified
     tasks = await task_service.get_all_tasks(user_id=user_id, limit=limit, offset=offset)
     if not tasks:
         raise HTTPException(status_code=404, detail="No tasks found")
-    return tasks
+    return json_response(task_list_adapter, tasks, response)
+
+
+# Paginación por cursor: la primera página se pide sin cursor y las siguientes con el `next_cursor` recibido
+@router.get('/limit={limit}', response_model=TaskPage, status_code=status.HTTP_200_OK)
+async def get_page(request: Request, response: Response, limit: int = Path(..., ge=1, le=settings.PAGE_MAX_LIMIT),
+                   cursor: Optional[str] = None, task_service: TaskService = Depends(get_read_task_service),
+                   current_user: User = Depends(admin_required)):
+    version = await task_service.get_collection_version(request.url.path, request.url.query)
+    not_modified = conditional_response(request, response, version)
+    if not_modified:
+        return not_modified
+    try:
+        tasks, next_cursor = await task_service.get_page(cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return json_response(task_page_adapter, {"items": tasks, "next_cursor": next_cursor}, response)
+
+
+@router.get('/user={user_id}/limit={limit}', response_model=TaskPage, status_code=status.HTTP_200_OK)
+async def get_page_by_user(user_id: str, request: Request, response: Response,
+                           limit: int = Path(..., ge=1, le=settings.PAGE_MAX_LIMIT), cursor: Optional[str] = None,
+                           task_service: TaskService = Depends(get_read_task_service),
+                           current_user: User = Depends(is_owner_or_admin_user)):
+    version = await task_service.get_collection_version(request.url.path, request.url.query, user_id=user_id)
+    not_modified = conditional_response(request, response, version)
+    if not_modified:
+        return not_modified
+    try:
+        tasks, next_cursor = await task_service.get_page_by_user(user_id=user_id, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return json_response(task_page_adapter, {"items": tasks, "next_cursor": next_cursor}, response)
+
+
+# Listado filtrado y ordenado; solo se admiten las combinaciones respaldadas por un índice (400 si no)
+@router.get('/user={user_id}/filter/limit={limit}', response_model=TaskPage, status_code=status.HTTP_200_OK)
+async def filter_by_user(user_id: str, request: Request, response: Response, filters: TaskListQuery = Depends(),
+                         limit: int = Path(..., ge=1, le=settings.PAGE_MAX_LIMIT), cursor: Optional[str] = None,
+                         task_service: TaskService = Depends(get_read_task_service),
+                         current_user: User = Depends(is_owner_or_admin_user)):
+    version = await task_service.get_collection_version(request.url.path, request.url.query, user_id=user_id)
+    not_modified = conditional_response(request, response, version)
+    if not_modified:
+        return not_modified
+    try:
+        tasks, next_cursor = await task_service.filter_page_by_user(user_id, filters, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return json_response(task_page_adapter, {"items": tasks, "next_cursor": next_cursor}, response)
+
+
+# GET condicional: si el ETag (o Last-Modified) del cliente sigue vigente se responde 304 sin cargar la tarea
+@router.get('/{task_id}', response_model=TaskResponse, status_code=status.HTTP_200_OK)
+async def get(task_id: str, request: Request, response: Response,
+              task_service: TaskService = Depends(get_read_task_service),
+              version: Version = Depends(get_authorized_task_version)):
+    not_modified = conditional_response(request, response, version)
+    if not_modified:
+        return not_modified
+    task = await task_service.get_by_id(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task
+
+
+@router.get('/{task_id}/tree', response_model=TaskTreeResponse, status_code=status.HTTP_200_OK)
+async def get_tree(task_id: str, task_service: TaskService = Depends(get_read_task_service),
+                   current_user: User = Depends(is_owner_or_admin_task)):
+    tree = await task_service.get_tree(task_id)
+    if not tree:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return tree
 
 
 @router.put('/{task_id}', response_model=TaskResponse, status_code=status.HTTP_200_OK)
 async def update(task_id: str, task_data: TaskUpdate, task_service: TaskService = Depends(get_task_service),
-                 current_user: User = Depends(is_owner_or_admin_task)):
+                 task: Task = Depends(get_authorized_task), current_user: User = Depends(get_current_user)):
     try:
-        updated_task = await task_service.update(task_id, task_data)
+        owner_id = None if current_user.is_admin else current_user.id
+        updated_task = await task_service.update(task_id, task_data, owner_id=owner_id)
         if not updated_task:
             raise HTTPException(status_code=404, detail="Task not found")
         return updated_task
@@ -68,9 +208,10 @@ async def update(task_id: str, task_data: TaskUpdate, task_service: TaskService
 
 @router.patch('/{task_id}', response_model=TaskResponse, status_code=status.HTTP_200_OK)
 async def partial_update(task_id: str, task_to_patch: TaskUpdate, task_service: TaskService = Depends(get_task_service),
-                         current_user: User = Depends(is_owner_or_admin_task)):
+                         task: Task = Depends(get_authorized_task), current_user: User = Depends(get_current_user)):
     try:
-        patched_task = await task_service.patch(task_id, task_to_patch)
+        owner_id = None if current_user.is_admin else current_user.id
+        patched_task = await task_service.patch(task_id, task_to_patch, owner_id=owner_id)
         if not patched_task:
             raise HTTPException(status_code=404, detail="Task not found")
         return patched_task
@@ -84,7 +225,7 @@ async def partial_update(task_id: str, task_to_patch: TaskUpdate, task_service:
 
 @router.delete('/{task_id}', status_code=status.HTTP_200_OK)
 async def delete(task_id: str, task_service: TaskService = Depends(get_task_service),
-                 current_user: User = Depends(is_owner_or_admin_task)):
+                 task: Task = Depends(get_authorized_task)):
     try:
         if not await task_service.delete(task_id):
             raise HTTPException(status_code=404, detail="Task not found")
@@ -1,9 +1,20 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Depends, Path, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.exc import IntegrityError
 
-from config.dependencies import is_owner_or_admin_user, get_user_service, admin_required
+from config.database import read_session_factory
+from config.dependencies import is_owner_or_admin_user, get_user_service, admin_required, open_task_service, \
+    get_read_task_service, get_read_user_service
+from config.replicas import prefers_primary
+from config.etag import conditional_response
+from config.serialization import json_response
+from config.settings import settings
 from models.models import User
-from schemas.schemas import UserResponse, UserCreate, UserUpdate
+from schemas.schemas import UserResponse, UserCreate, UserUpdate, UserPage, TaskStatsResponse, TaskResponse, \
+    user_list_adapter, user_page_adapter, task_list_adapter
+from services.task_service import TaskService
 from services.user_service import UserService
 
 router = APIRouter(prefix="/users", tags=["users"])
@@ -22,22 +33,96 @@ async def create(user_data: UserCreate, user_service: UserService = Depends(get_
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+# Los listados deben declararse antes de GET /{user_id}: si no, /limit=10 se tomaría como un id
+@router.get('/limit={limit}/offset={offset}', response_model=List[UserResponse], status_code=status.HTTP_200_OK)
+async def get_all(request: Request, response: Response, limit: int = Path(..., ge=1, le=settings.PAGE_MAX_LIMIT),
+                  offset: int = Path(..., ge=0), user_service: UserService = Depends(get_read_user_service),
+                  current_user: User = Depends(admin_required)):
+    version = await user_service.get_collection_version(request.url.path, request.url.query)
+    not_modified = conditional_response(request, response, version)
+    if not_modified:
+        return not_modified
+    try:
+        users = await user_service.get_all(limit=limit, offset=offset)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # response_model no se aplica al devolver un Response: el adaptador de UserResponse es el que
+    # deja fuera el hash de la contraseña
+    return json_response(user_list_adapter, users, response)
+
+
+@router.get('/limit={limit}', response_model=UserPage, status_code=status.HTTP_200_OK)
+async def get_page(request: Request, response: Response, limit: int = Path(..., ge=1, le=settings.PAGE_MAX_LIMIT),
+                   cursor: Optional[str] = None, user_service: UserService = Depends(get_read_user_service),
+                   current_user: User = Depends(admin_required)):
+    version = await user_service.get_collection_version(request.url.path, request.url.query)
+    not_modified = conditional_response(request, response, version)
+    if not_modified:
+        return not_modified
+    try:
+        users, next_cursor = await user_service.get_page(cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return json_response(user_page_adapter, {"items": users, "next_cursor": next_cursor}, response)
+
+
 @router.get('/{user_id}', response_model=UserResponse, status_code=status.HTTP_200_OK)
-async def get(user_id: str, user_service: UserService = Depends(get_user_service),
+async def get(user_id: str, request: Request, response: Response,
+              user_service: UserService = Depends(get_read_user_service),
               current_user: User = Depends(is_owner_or_admin_user)):
+    version = await user_service.get_version(user_id)
+    if not version:
+        raise HTTPException(status_code=404, detail="User not found")
+    not_modified = conditional_response(request, response, version)
+    if not_modified:
+        return not_modified
     user = await user_service.get_by_id(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
 
-@router.get('/limit={limit}/offset={offset}', status_code=status.HTTP_200_OK)
-async def get_all(limit: int = 100, offset: int = 0, user_service: UserService = Depends(get_user_service),
-                  current_user: User = Depends(admin_required)):
-    try:
-        return await user_service.get_all(limit=limit, offset=offset)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+@router.get('/{user_id}/tasks/export', status_code=status.HTTP_200_OK)
+async def export_tasks(user_id: str, request: Request,
+                       export_format: Literal['ndjson', 'csv'] = Query('ndjson', alias='format'),
+                       current_user: User = Depends(is_owner_or_admin_user)):
+    session_factory = read_session_factory(prefers_primary(request.headers))
+
+    async def content():
+        async with open_task_service(session_factory) as task_service:
+            async for chunk in task_service.export_by_user(user_id, export_format):
+                yield chunk
+
+    media_type = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    return StreamingResponse(
+        content(),
+        media_type=media_type,
+        headers={'Content-Disposition': f'attachment; filename="tasks-{user_id}.{export_format}"'},
+    )
+
+
+@router.get('/{user_id}/tasks/stats', response_model=TaskStatsResponse, status_code=status.HTTP_200_OK)
+async def task_stats(user_id: str, task_service: TaskService = Depends(get_read_task_service),
+                     current_user: User = Depends(is_owner_or_admin_user)):
+    return await task_service.get_stats(user_id)
+
+
+# Lo siguiente por hacer: tareas abiertas por urgencia y fecha límite
+@router.get('/{user_id}/tasks/next', response_model=List[TaskResponse], status_code=status.HTTP_200_OK)
+async def next_tasks(user_id: str, limit: int = Query(10, ge=1, le=100),
+                     task_service: TaskService = Depends(get_read_task_service),
+                     current_user: User = Depends(is_owner_or_admin_user)):
+    tasks = await task_service.get_next_by_user(user_id, limit=limit)
+    return json_response(task_list_adapter, tasks)
+
+
+# Tareas abiertas cuya fecha límite ya pasó, de la más antigua a la más reciente
+@router.get('/{user_id}/tasks/overdue', response_model=List[TaskResponse], status_code=status.HTTP_200_OK)
+async def overdue_tasks(user_id: str, limit: int = Query(100, ge=1, le=1000),
+                        task_service: TaskService = Depends(get_read_task_service),
+                        current_user: User = Depends(is_owner_or_admin_user)):
+    tasks = await task_service.get_overdue_by_user(user_id, limit=limit)
+    return json_response(task_list_adapter, tasks)
 
 
 @router.put('/{user_id}', response_model=UserResponse, status_code=status.HTTP_200_OK)
@@ -1,11 +1,22 @@
 from datetime import datetime
-from typing import Optional, List
+from typing import Annotated, Dict, Literal, Optional, List
 
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import AfterValidator, BaseModel, EmailStr, Field, TypeAdapter
 
 from models.models import PriorityEnum
 
 
+# Las fechas se guardan como hora local sin zona (datetime.now()); una fecha recibida con zona horaria
+# se convierte a esa misma referencia para poder compararla con las guardadas y con datetime.now()
+def to_local_naive(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value
+    return value.astimezone().replace(tzinfo=None)
+
+
+LocalDatetime = Annotated[datetime, AfterValidator(to_local_naive)]
+
+
 class UserBase(BaseModel):
     first_names: str = Field(None, min_length=3, max_length=64)
     last_names: str = Field(None, min_length=3, max_length=64)
@@ -42,13 +53,19 @@ class UserResponse(UserBase):
     updated_at: datetime
 
 
+# Página de la paginación por cursor
+class UserPage(BaseModel):
+    items: List[UserResponse]
+    next_cursor: Optional[str] = None
+
+
 class TaskBase(BaseModel):
     title: str = Field(min_length=5, max_length=100)
     description: Optional[str] = Field(None, max_length=512)
     completed: bool = False
     priority: PriorityEnum = PriorityEnum.PODER
-    started_at: Optional[datetime] = None
-    finished_at: Optional[datetime] = None
+    started_at: Optional[LocalDatetime] = None
+    finished_at: Optional[LocalDatetime] = None
     level: Optional[int] = 1
 
     class ConfigDict:
@@ -66,9 +83,9 @@ class TaskUpdate(BaseModel):
     description: Optional[str] = None
     completed: Optional[bool] = None
     priority: Optional[PriorityEnum] = None
-    started_at: Optional[datetime] = None
-    end_at: Optional[datetime] = None
-    finished_at: Optional[datetime] = None
+    started_at: Optional[LocalDatetime] = None
+    end_at: Optional[LocalDatetime] = None
+    finished_at: Optional[LocalDatetime] = None
     parent_id: Optional[str] = None
     level: Optional[int] = None
 
@@ -108,7 +125,132 @@ class TaskResponse(TaskBase):
     subtasks: List[MinimalTaskResponse] = []
 
 
+# Fila plana de la exportación de tareas (sin relaciones)
+class TaskExport(BaseModel):
+    id: str
+    title: str
+    description: Optional[str] = None
+    completed: bool
+    priority: PriorityEnum
+    started_at: Optional[datetime] = None
+    end_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    level: int
+    user_id: str
+    parent_id: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+
+# Nodo del árbol de tareas devuelto por /tasks/{task_id}/tree
+class TaskTreeResponse(TaskBase):
+    id: str
+    user_id: str
+    parent_id: Optional[str] = None
+    end_at: Optional[datetime] = None
+    created_at: datetime
+    updated_at: datetime
+    children: List["TaskTreeResponse"] = []
+
+
+class TaskPage(BaseModel):
+    items: List[TaskResponse]
+    next_cursor: Optional[str] = None
+
+
+# Filtros y orden del listado filtrado de tareas de un usuario (ver TaskRepository.filter_page).
+# Se admite como mucho un rango de fechas y debe ser sobre la columna de orden; si no se indica sort,
+# se ordena por la columna del rango o por created_at. Ordenar por una fecha opcional (end_at,
+# started_at, finished_at) deja fuera las tareas que no la tienen
+class TaskListQuery(BaseModel):
+    completed: Optional[bool] = None
+    priority: Optional[PriorityEnum] = None
+    level: Optional[int] = Field(None, ge=1, le=3)
+    parent_id: Optional[str] = None
+    started_from: Optional[LocalDatetime] = None
+    started_to: Optional[LocalDatetime] = None
+    end_from: Optional[LocalDatetime] = None
+    end_to: Optional[LocalDatetime] = None
+    finished_from: Optional[LocalDatetime] = None
+    finished_to: Optional[LocalDatetime] = None
+    sort: Optional[Literal['created_at', 'started_at', 'end_at', 'finished_at']] = None
+    order: Literal['asc', 'desc'] = 'asc'
+
+
+# Resultados de búsqueda por relevancia; la página siguiente se pide con offset=next_offset
+class TaskSearchPage(BaseModel):
+    items: List[TaskResponse]
+    next_offset: Optional[int] = None
+
+
+# Error de un elemento concreto en las operaciones en lote
+class BulkItemError(BaseModel):
+    index: int
+    detail: str
+
+
+class TaskBulkCreateResult(BaseModel):
+    created: List[str] = []
+    errors: List[BulkItemError] = []
+
+
+# Resumen de una importación NDJSON; en los errores, index es el número de línea
+class TaskImportResult(BaseModel):
+    lines: int = 0
+    created: int = 0
+    chunks: int = 0
+    errors: List[BulkItemError] = []
+
+
+# Selección de tareas para las actualizaciones en lote: por ids, por filtro o ambos
+class TaskBulkFilter(BaseModel):
+    user_id: Optional[str] = None
+    completed: Optional[bool] = None
+    priority: Optional[PriorityEnum] = None
+    parent_id: Optional[str] = None
+
+
+# Campos que se pueden cambiar en lote; solo se aplican los enviados
+class TaskBulkPatch(BaseModel):
+    completed: Optional[bool] = None
+    priority: Optional[PriorityEnum] = None
+    end_at: Optional[LocalDatetime] = None
+    finished_at: Optional[LocalDatetime] = None
+    parent_id: Optional[str] = None
+
+
+class TaskBulkUpdate(BaseModel):
+    ids: Optional[List[str]] = None
+    filter: Optional[TaskBulkFilter] = None
+    patch: TaskBulkPatch
+
+
+class TaskBulkUpdateResult(BaseModel):
+    updated: int
+    tasks: List[MinimalTaskResponse] = []
+
+
+class TaskCounts(BaseModel):
+    total: int = 0
+    completed: int = 0
+    pending: int = 0
+
+
+class TaskStatsResponse(TaskCounts):
+    # Tareas sin completar cuyo end_at ya pasó
+    overdue: int = 0
+    by_priority: Dict[PriorityEnum, TaskCounts] = {}
+
+
 class Token(BaseModel):
     access_token: str
     refresh_token: Optional[str] = None
-    token_type: str
\ No newline at end of file
+    token_type: str
+
+
+# Validadores/serializadores precompilados para las respuestas de listas y páginas (ver config/serialization.py)
+task_list_adapter = TypeAdapter(List[TaskResponse])
+task_page_adapter = TypeAdapter(TaskPage)
+task_search_adapter = TypeAdapter(TaskSearchPage)
+user_list_adapter = TypeAdapter(List[UserResponse])
+user_page_adapter = TypeAdapter(UserPage)
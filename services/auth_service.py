@@ -13,6 +13,10 @@ class AuthService:
 
     async def authenticate_user(self, email: str, password: str) -> Optional[User]:
         user = await self.user_repo.get_user_by_email(email)
-        if not user or not user.check_password(password) or not user.is_active:
+        if not user:
+            return None
+        # Una ráfaga de logins no debe dejar el pool sin conexiones mientras espera a bcrypt
+        await self.user_repo.release_connection()
+        if not await user.acheck_password(password) or not user.is_active:
             return None
         return user
@@ -1,8 +1,13 @@
-from typing import TypeVar, Generic, Optional, List
+from contextlib import AbstractAsyncContextManager
+from typing import TypeVar, Generic, Optional, List, Tuple
 
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import SQLModel
 
+from config.etag import Version, make_version
+from repositories.base_repo import unit_of_work
+
 # El modelo de DB a usar
 ModelType = TypeVar('ModelType', bound=SQLModel)
 # El esquema de Pydantic a crear
@@ -18,12 +23,34 @@ class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType, Reposit
         self.repository = repository
         self.model = model
 
+    # Agrupa varias escrituras en una sola transacción:
+    #     async with self.unit_of_work():
+    #         await self.repository.create(...)
+    #         await self.other_repo.update(...)
+    # Los repositorios que comparten la sesión solo hacen flush y el commit se hace al salir del bloque
+    def unit_of_work(self) -> AbstractAsyncContextManager[AsyncSession]:
+        return unit_of_work(self.repository.session)
+
     async def get_by_id(self, object_id: str) -> Optional[ModelType]:
-        return await self.repository.get_object_by_id(object_id)
+        return await self.repository.get_object_with_relations(object_id)
+
+    async def get_version(self, object_id: str) -> Optional[Version]:
+        info = await self.repository.get_version_info(object_id)
+        if info is None:
+            return None
+        return make_version(self.model.__tablename__, info.id, info.updated_at, last_modified=info.updated_at)
+
+    # `key` distingue las páginas (límite, offset, cursor) de una misma colección
+    async def get_collection_version(self, *key) -> Version:
+        count, last_updated = await self.repository.get_collection_version()
+        return make_version(self.model.__tablename__, *key, count, last_updated, last_modified=last_updated)
 
     async def get_all(self, offset: int = 0, limit: int = 100) -> Optional[List[ModelType]]:
         return await self.repository.get_all(offset=offset, limit=limit)
 
+    async def get_page(self, cursor: Optional[str] = None, limit: int = 100) -> Tuple[List[ModelType], Optional[str]]:
+        return await self.repository.get_page(cursor=cursor, limit=limit)
+
     async def create(self, obj_create_data: CreateSchemaType) -> ModelType:
         obj_model = self.model(**obj_create_data.model_dump())
         return await self.repository.create(obj_model)
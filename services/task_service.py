@@ -1,28 +1,209 @@
-from typing import Optional, List
+import csv
+import io
+import json
+import re
+from datetime import datetime
+from typing import AsyncIterator, Dict, Optional, List, Tuple
 
-from models.models import Task
+from sqlalchemy import inspect
+from sqlalchemy.exc import IntegrityError
+
+from config.etag import Version, latest, make_version
+from config.scheduler import deadline_scheduler
+from config.settings import settings
+from models.models import Task, User
 from repositories.task_repo import TaskRepository
 from repositories.user_repo import UserRepository
-from schemas.schemas import TaskCreate, TaskUpdate
+from schemas.schemas import TaskCreate, TaskUpdate, TaskTreeResponse, BulkItemError, TaskBulkCreateResult, \
+    TaskBulkUpdate, TaskBulkUpdateResult, TaskExport, TaskImportResult, TaskStatsResponse, TaskCounts, TaskListQuery
 from services.base_service import BaseService
 
 
+# Parte un cuerpo recibido en bloques arbitrarios en líneas, sin acumular más que la línea en curso
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    pending = b''
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b'\n')
+        for line in lines:
+            yield line
+    if pending:
+        yield pending
+
+
 class TaskService(BaseService[Task, TaskCreate, TaskUpdate, TaskRepository]):
     def __init__(self, task_repo: TaskRepository, user_repo: UserRepository):
         super().__init__(repository=task_repo, model=Task)
         self.user_repo = user_repo
 
+    # La unicidad de (user_id, title) la garantiza el índice único ix_tasks_user_id_title,
+    # así que no hace falta un SELECT previo en cada escritura
+    @staticmethod
+    def _is_duplicate_title(ex: IntegrityError) -> bool:
+        message = str(ex.orig)
+        return 'ix_tasks_user_id_title' in message or 'tasks.user_id, tasks.title' in message
+
+    # Devuelve la tarea con user y subtasks cargados, listos para serializar como TaskResponse.
+    # Si ya venían cargados (p. ej. por get_authorized_task) no se vuelven a consultar.
+    # Con relevel, el level de sus descendientes se recalcula en la misma transacción (cambio de padre)
+    async def _save(self, task: Task, is_new: bool = False, relevel: bool = False) -> Task:
+        try:
+            async with self.unit_of_work():
+                if is_new:
+                    task = await self.repository.create(task)
+                else:
+                    task = await self.repository.update(task)
+                if relevel:
+                    await self.repository.relevel_descendants([task.id])
+        except IntegrityError as ex:
+            if self._is_duplicate_title(ex):
+                raise ValueError("Task already exists")
+            raise ex
+        self._track_deadline(task)
+        return await self._with_relations(task)
+
+    # Mantiene al día el planificador de vencimientos una vez confirmada la escritura.
+    # La escritura ya está hecha: un fallo del planificador no debe convertirla en un error para el cliente
+    @staticmethod
+    def _schedule_deadline(task_id: str, user_id: str, end_at: Optional[datetime], completed: bool) -> None:
+        try:
+            deadline_scheduler.schedule(task_id, user_id, end_at, completed)
+        except Exception as ex:
+            print(f"Could not schedule the deadline of task {task_id}: {ex}")
+
+    def _track_deadline(self, task: Task) -> None:
+        self._schedule_deadline(task.id, task.user_id, task.end_at, task.completed)
+
+    # Valida mover las tareas de criteria bajo parent_id (None: sin padre) con el level new_level: el nuevo
+    # padre no puede estar dentro de sus subárboles (sería un ciclo) y sus subtareas no pueden pasar del
+    # nivel 3. Devuelve si tienen descendientes, cuyo level habrá que recalcular
+    async def _check_subtree_move(self, criteria: list, parent_id: Optional[str], new_level: int) -> bool:
+        descendants = await self.repository.get_descendant_depths(criteria)
+        if parent_id in descendants:
+            raise ValueError("The new parent task is a subtask of a task being moved.")
+        if descendants and new_level + max(descendants.values()) > 3:
+            raise ValueError("The subtasks would exceed the max level (3) under the new parent.")
+        return bool(descendants)
+
+    async def _with_relations(self, task: Task) -> Task:
+        if not {'user', 'subtasks'} & inspect(task).unloaded:
+            return task
+        return await self.repository.get_object_with_relations(task.id)
+
+    # Devuelve también el dueño de la tarea para autorizar sin cargarla
+    async def get_version_and_owner(self, task_id: str) -> Optional[Tuple[str, Version]]:
+        info = await self.repository.get_version_info(task_id)
+        if info is None:
+            return None
+        version = make_version(
+            'tasks', info.id, info.updated_at, info.user_updated_at, info.subtasks, info.subtasks_updated_at,
+            last_modified=latest(info.updated_at, info.user_updated_at, info.subtasks_updated_at),
+        )
+        return info.user_id, version
+
+    async def get_version(self, object_id: str) -> Optional[Version]:
+        version_and_owner = await self.get_version_and_owner(object_id)
+        return version_and_owner[1] if version_and_owner else None
+
+    # El conteo y el último updated_at de las tareas (incluidas las subtareas, que normalmente son del
+    # mismo usuario) detectan altas, bajas y cambios; el updated_at de los usuarios cubre los datos de `user`
+    async def get_collection_version(self, *key, user_id: Optional[str] = None) -> Version:
+        task_criteria = [Task.user_id == user_id] if user_id else []
+        user_criteria = [User.id == user_id] if user_id else []
+        count, tasks_updated_at = await self.repository.get_collection_version(*task_criteria)
+        _, users_updated_at = await self.user_repo.get_collection_version(*user_criteria)
+        return make_version(
+            'tasks', user_id, *key, count, tasks_updated_at, users_updated_at,
+            last_modified=latest(tasks_updated_at, users_updated_at),
+        )
+
     async def get_all_tasks(self, user_id: str, offset: int = 0, limit: int = 100) -> List[Task]:
         return await self.repository.get_task_by_user(user_id=user_id, offset=offset, limit=limit)
 
+    async def get_page_by_user(self, user_id: str, cursor: Optional[str] = None,
+                               limit: int = 100) -> Tuple[List[Task], Optional[str]]:
+        return await self.repository.get_task_page_by_user(user_id=user_id, cursor=cursor, limit=limit)
+
+    # Los conteos salen de task_stats (unas pocas filas por usuario, sin importar cuántas tareas tenga);
+    # solo las vencidas, que dependen de la hora, se cuentan sobre tasks con un índice
+    async def get_stats(self, user_id: str) -> TaskStatsResponse:
+        stats = TaskStatsResponse()
+        for row in await self.repository.stats.get_by_user(user_id):
+            for counts in (stats, stats.by_priority.setdefault(row.priority, TaskCounts())):
+                counts.total += row.count
+                if row.completed:
+                    counts.completed += row.count
+                else:
+                    counts.pending += row.count
+        stats.overdue = await self.repository.count_overdue(user_id, datetime.now())
+        return stats
+
+    # Devuelve la página de resultados y el offset de la siguiente (None si no hay más)
+    async def search(self, query: str, user_id: Optional[str] = None, offset: int = 0,
+                     limit: int = 20) -> Tuple[List[Task], Optional[int]]:
+        terms = re.findall(r'\w+', query.lower())[:settings.TASK_SEARCH_MAX_TERMS]
+        if not terms:
+            raise ValueError("The search query has no searchable words.")
+
+        tasks = await self.repository.search(terms, user_id=user_id, offset=offset, limit=limit + 1)
+        if len(tasks) <= limit:
+            return tasks, None
+        return tasks[:limit], offset + limit
+
+    async def get_next_by_user(self, user_id: str, limit: int = 10) -> List[Task]:
+        return await self.repository.get_next_by_user(user_id, limit=limit)
+
+    async def get_overdue_by_user(self, user_id: str, limit: int = 100) -> List[Task]:
+        return await self.repository.get_overdue_by_user(user_id, datetime.now(), limit=limit)
+
+    async def filter_page_by_user(self, user_id: str, query: TaskListQuery, cursor: Optional[str] = None,
+                                  limit: int = 100) -> Tuple[List[Task], Optional[str]]:
+        return await self.repository.filter_page(user_id, query, cursor=cursor, limit=limit)
+
+    # Arma el árbol en memoria en O(n) a partir de las filas planas del CTE
+    async def get_tree(self, task_id: str) -> Optional[TaskTreeResponse]:
+        tasks = await self.repository.get_subtree(task_id)
+        nodes = {task.id: TaskTreeResponse.model_validate(task, from_attributes=True) for task in tasks}
+        if task_id not in nodes:
+            return None
+
+        for task in tasks:
+            if task.id != task_id and task.parent_id in nodes:
+                nodes[task.parent_id].children.append(nodes[task.id])
+        return nodes[task_id]
+
+    # Serializa las tareas del usuario a medida que llegan de la base, en bloques de chunk_size filas.
+    # La memoria usada no depende de cuántas tareas tenga el usuario
+    async def export_by_user(self, user_id: str, export_format: str = 'ndjson',
+                             chunk_size: int = 500) -> AsyncIterator[str]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if export_format == 'csv':
+            writer.writerow(TaskExport.model_fields.keys())
+
+        rows = 0
+        async for task in self.repository.stream_by_user(user_id, batch_size=chunk_size):
+            row = TaskExport.model_validate(task, from_attributes=True)
+            if export_format == 'csv':
+                writer.writerow(row.model_dump(mode='json').values())
+            else:
+                buffer.write(row.model_dump_json())
+                buffer.write('\n')
+
+            rows += 1
+            if rows % chunk_size == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue()
+
     async def create(self, obj_create_data: TaskCreate) -> Task:
         user = await self.user_repo.get_object_by_id(str(obj_create_data.user_id))
         if not user:
             raise ValueError("User not found")
 
-        if await self.repository.get_task_by_title(obj_create_data.title, obj_create_data.user_id):
-            raise ValueError("Task already exists")
-
         if obj_create_data.parent_id:
             parent_task = await self.repository.get_object_by_id(str(obj_create_data.parent_id))
             if not parent_task:
@@ -35,67 +216,297 @@ class TaskService(BaseService[Task, TaskCreate, TaskUpdate, TaskRepository]):
             obj_create_data.level = 1
 
         new_task = self.model(**obj_create_data.model_dump())
-        return await self.repository.create(new_task)
+        return await self._save(new_task, is_new=True)
+
+    # Aplica las mismas reglas que create a todo un lote, pero con una consulta por regla
+    # (usuarios, padres, títulos) en lugar de varias por tarea.
+    # Devuelve las tareas listas para insertar y los errores de cada elemento rechazado.
+    # Para las importaciones, refs son los ids externos de cada elemento y resolved acumula
+    # id externo -> (id nuevo, user_id, level), de modo que parent_id puede apuntar a un elemento ya aceptado
+    async def _prepare_batch(self, items: List[TaskCreate], owner_id: Optional[str] = None,
+                             refs: Optional[List[Optional[str]]] = None,
+                             resolved: Optional[Dict[str, Tuple[str, str, int]]] = None
+                             ) -> Tuple[List[Task], List[BulkItemError]]:
+        resolved = {} if resolved is None else resolved
+        existing_users = await self.user_repo.get_existing_ids(item.user_id for item in items)
+        parent_ids = {item.parent_id for item in items if item.parent_id and item.parent_id not in resolved}
+        parents = await self.repository.get_parent_info(parent_ids) if parent_ids else {}
+        taken_titles = await self.repository.get_existing_titles((item.user_id, item.title) for item in items)
+
+        rows: List[Task] = []
+        errors: List[BulkItemError] = []
+        for index, item in enumerate(items):
+            parent_id, parent = item.parent_id, None
+            if parent_id in resolved:
+                parent_id, parent_user_id, parent_level = resolved[parent_id]
+                parent = (parent_user_id, parent_level)
+            elif parent_id:
+                parent = parents.get(parent_id)
+
+            if owner_id is not None and item.user_id != owner_id:
+                error = "You are not the owner of this user account."
+            elif item.user_id not in existing_users:
+                error = "User not found"
+            elif (item.user_id, item.title) in taken_titles:
+                error = "Task already exists"
+            elif item.parent_id and parent is None:
+                error = f"Parent task with ID {item.parent_id} not found."
+            elif parent and owner_id is not None and parent[0] != owner_id:
+                error = "You are not the owner of the parent task."
+            elif parent and parent[1] >= 3:
+                error = "Parent task's level is too high (max 3) to add a subtask."
+            else:
+                error = None
 
-    async def update(self, task_id: str, data: TaskUpdate) -> Optional[Task]:
+            if error:
+                errors.append(BulkItemError(index=index, detail=error))
+                continue
+
+            # Los títulos repetidos dentro del mismo lote también cuentan
+            taken_titles.add((item.user_id, item.title))
+            # Sin los None para que se apliquen los valores por defecto del modelo (p. ej. started_at)
+            data = item.model_dump(exclude_none=True)
+            data['parent_id'] = parent_id
+            data['level'] = parent[1] + 1 if parent else 1
+            task = self.model(**data)
+            rows.append(task)
+            if refs and refs[index]:
+                resolved[refs[index]] = (task.id, task.user_id, task.level)
+
+        return rows, errors
+
+    # owner_id limita el lote a las tareas de ese usuario (None para administradores)
+    async def bulk_create(self, items: List[TaskCreate], owner_id: Optional[str] = None) -> TaskBulkCreateResult:
+        if len(items) > settings.TASK_BULK_MAX_ITEMS:
+            raise ValueError(f"Too many tasks in one request (max {settings.TASK_BULK_MAX_ITEMS}).")
+
+        rows, errors = await self._prepare_batch(items, owner_id)
+        if rows:
+            try:
+                await self.repository.bulk_create(rows)
+            except IntegrityError as ex:
+                # Otra escritura concurrente ocupó alguno de los títulos entre la validación y el INSERT
+                if self._is_duplicate_title(ex):
+                    raise ValueError("Task already exists")
+                raise ex
+            for row in rows:
+                self._track_deadline(row)
+
+        return TaskBulkCreateResult(created=[row.id for row in rows], errors=errors)
+
+    # Importa tareas desde un cuerpo NDJSON que se va leyendo línea a línea.
+    # Cada bloque de chunk_size líneas válidas se valida con _prepare_batch y se confirma en su propia
+    # transacción, así que la memoria no depende del tamaño del archivo (salvo el mapa de ids externos).
+    # Una línea puede traer un "id" propio del sistema de origen para que otras la usen como parent_id;
+    # el padre tiene que aparecer antes que sus hijos
+    async def import_ndjson(self, lines: AsyncIterator[bytes], owner_id: Optional[str] = None,
+                            chunk_size: int = 1000) -> TaskImportResult:
+        result = TaskImportResult()
+        resolved: Dict[str, Tuple[str, str, int]] = {}
+        line_numbers: List[int] = []
+        refs: List[Optional[str]] = []
+        items: List[TaskCreate] = []
+
+        async def flush_chunk() -> None:
+            rows, errors = await self._prepare_batch(items, owner_id, refs=refs, resolved=resolved)
+            result.errors.extend(BulkItemError(index=line_numbers[error.index], detail=error.detail)
+                                 for error in errors)
+            if rows:
+                try:
+                    await self.repository.bulk_create(rows)
+                except IntegrityError as ex:
+                    # Se pierde el bloque completo; sus ids externos dejan de ser padres válidos
+                    detail = "Task already exists" if self._is_duplicate_title(ex) else str(ex.orig)
+                    accepted = {row.id for row in rows}
+                    for ref, (task_id, _, _) in list(resolved.items()):
+                        if task_id in accepted:
+                            del resolved[ref]
+                    failed = set(line_numbers) - {line_numbers[error.index] for error in errors}
+                    result.errors.extend(BulkItemError(index=line_number, detail=detail)
+                                         for line_number in sorted(failed))
+                else:
+                    result.created += len(rows)
+                    for row in rows:
+                        self._track_deadline(row)
+            result.chunks += 1
+            line_numbers.clear()
+            refs.clear()
+            items.clear()
+
+        line_number = 0
+        async for line in lines:
+            line_number += 1
+            if not line.strip():
+                continue
+            result.lines += 1
+            try:
+                payload = json.loads(line)
+                if not isinstance(payload, dict):
+                    raise ValueError("Each line must be a JSON object.")
+                ref = payload.pop('id', None)
+                item = TaskCreate.model_validate(payload)
+            except ValueError as ex:
+                # json.JSONDecodeError y pydantic.ValidationError son subclases de ValueError
+                result.errors.append(BulkItemError(index=line_number, detail=str(ex)))
+                continue
+
+            line_numbers.append(line_number)
+            refs.append(str(ref) if ref is not None else None)
+            items.append(item)
+            if len(items) >= chunk_size:
+                await flush_chunk()
+
+        if items:
+            await flush_chunk()
+        result.errors.sort(key=lambda error: error.index)
+        return result
+
+    # Aplica el mismo parche a todas las tareas seleccionadas con un solo UPDATE.
+    # La propiedad se comprueba en el propio WHERE (owner_id None para administradores)
+    async def bulk_patch(self, data: TaskBulkUpdate, owner_id: Optional[str] = None) -> TaskBulkUpdateResult:
+        if data.ids is None and data.filter is None:
+            raise ValueError("Either ids or filter must be provided.")
+        if data.ids is not None and len(data.ids) > settings.TASK_BULK_MAX_ITEMS:
+            raise ValueError(f"Too many tasks in one request (max {settings.TASK_BULK_MAX_ITEMS}).")
+
+        values = data.patch.model_dump(exclude_unset=True)
+        if not values:
+            raise ValueError("Nothing to update.")
+
+        criteria = []
+        if data.ids is not None:
+            criteria.append(Task.id.in_(data.ids))
+        if data.filter is not None:
+            predicates = data.filter.model_dump(exclude_unset=True)
+            # Un filtro vacío seleccionaría todas las tareas (todas las de la base para un administrador)
+            if data.ids is None and not predicates:
+                raise ValueError("The filter must include at least one field.")
+            for key, value in predicates.items():
+                criteria.append(getattr(Task, key) == value)
+        if owner_id is not None:
+            criteria.append(Task.user_id == owner_id)
+
+        if 'parent_id' in values:
+            new_parent_id = values['parent_id']
+            if new_parent_id:
+                parent = (await self.repository.get_parent_info([new_parent_id])).get(new_parent_id)
+                if not parent:
+                    raise ValueError(f"New parent task with ID {new_parent_id} not found.")
+                if owner_id is not None and parent[0] != owner_id:
+                    raise ValueError("You are not the owner of the new parent task.")
+                if parent[1] >= 3:
+                    raise ValueError("New parent task's level is too high (max 3) to add a subtask.")
+                values['level'] = parent[1] + 1
+                # Una tarea no puede ser su propio padre
+                criteria.append(Task.id != new_parent_id)
+            else:
+                values['level'] = 1
+        relevel = 'parent_id' in values and await self._check_subtree_move(
+            criteria, values['parent_id'], values['level']
+        )
+
+        returning = (Task.id, Task.title, Task.completed, Task.priority)
+        tracks_deadline = bool({'user_id', 'completed', 'end_at'} & values.keys())
+        if tracks_deadline:
+            returning += (Task.user_id, Task.end_at)
+        async with self.unit_of_work():
+            rows = await self.repository.bulk_update(criteria, values, returning=returning)
+            if relevel:
+                await self.repository.relevel_descendants(row['id'] for row in rows)
+        if tracks_deadline:
+            for row in rows:
+                self._schedule_deadline(row['id'], row['user_id'], row['end_at'], row['completed'])
+        return TaskBulkUpdateResult(updated=len(rows), tasks=rows)
+
+    # owner_id es el usuario que hace la petición (None para administradores): solo puede mover la tarea
+    # bajo una tarea suya
+    async def update(self, task_id: str, data: TaskUpdate, owner_id: Optional[str] = None) -> Optional[Task]:
         task = await self.repository.get_object_by_id(task_id)
         if not task:
             raise ValueError("Task not found")
 
-        if data.title and data.title != task.title:
-            existing_task = await self.repository.get_task_by_title(data.title, task.user_id)
-            if existing_task and existing_task.id != task.id:
-                raise ValueError("Task with same title already exists for this user")
+        if data.title:
             task.title = data.title
 
+        relevel = False
         if data.parent_id is not None:
+            if data.parent_id == task_id:
+                raise ValueError("A task cannot be its own parent.")
             if data.parent_id:
                 parent_task = await self.repository.get_object_by_id(str(data.parent_id))
                 if not parent_task:
                     raise ValueError(f"New parent task with ID {data.parent_id} not found.")
+                if owner_id is not None and parent_task.user_id != owner_id:
+                    raise ValueError("You are not the owner of the new parent task.")
                 if parent_task.level >= 3:
                     raise ValueError("New parent task's level is too high to add a subtask.")
-                task.parent_id = data.parent_id
-                task.level = parent_task.level + 1
+                new_level = parent_task.level + 1
             else:  # parent_id es None
-                task.parent_id = None
-                task.level = 1
+                new_level = 1
+            relevel = await self._check_subtree_move([Task.id == task_id], data.parent_id or None, new_level)
+            task.parent_id = data.parent_id or None
+            task.level = new_level
 
-        for key, value in data.model_dump(exclude={'title', 'parent_id'}, exclude_unset=True).items():
+        # Al cambiar de padre el level es el calculado, no el enviado
+        exclude = {'title', 'parent_id', 'level'} if data.parent_id is not None else {'title', 'parent_id'}
+        for key, value in data.model_dump(exclude=exclude, exclude_unset=True).items():
             if hasattr(task, key):
                 setattr(task, key, value)
 
-        return await self.repository.update(task)
-
-    async def patch(self, task_id: str, data: TaskUpdate) -> Optional[Task]:
-        task = await self.repository.get_object_by_id(task_id)
-        if not task:
-            raise ValueError(f"Task with ID {task_id} not found.")
+        return await self._save(task, relevel=relevel)
 
+    # owner_id como en update
+    async def patch(self, task_id: str, data: TaskUpdate, owner_id: Optional[str] = None) -> Optional[Task]:
         # Obtener los datos del esquema que realmente se enviaron (el parche)
         update_data = data.model_dump(exclude_unset=True, exclude_none=True)
 
-        if 'title' in update_data and update_data['title'] != task.title:
-            existing_task = await self.repository.get_task_by_title(update_data['title'], task.user_id)
-            if existing_task and existing_task.id != task.id:
-                raise ValueError(f"Task with title '{update_data['title']}' already exists for this user.")
+        # Sin cambio de padre no hace falta leer la tarea: un único UPDATE ... RETURNING con las columnas enviadas
+        if 'parent_id' not in update_data:
+            try:
+                async with self.unit_of_work():
+                    task = await self.repository.update_by_id(task_id, update_data)
+            except IntegrityError as ex:
+                if self._is_duplicate_title(ex):
+                    raise ValueError("Task already exists")
+                raise ex
+            if not task:
+                raise ValueError(f"Task with ID {task_id} not found.")
+            self._track_deadline(task)
+            return await self._with_relations(task)
 
+        task = await self.repository.get_object_by_id(task_id)
+        if not task:
+            raise ValueError(f"Task with ID {task_id} not found.")
+
+        relevel = False
         if 'parent_id' in update_data:
             new_parent_id = update_data['parent_id']
+            if new_parent_id == task_id:
+                raise ValueError("A task cannot be its own parent.")
             if new_parent_id:
                 parent_task = await self.repository.get_object_by_id(str(new_parent_id))
                 if not parent_task:
                     raise ValueError(f"New parent task with ID {new_parent_id} not found.")
+                if owner_id is not None and parent_task.user_id != owner_id:
+                    raise ValueError("You are not the owner of the new parent task.")
                 if parent_task.level >= 3:
                     raise ValueError("New parent task's level is too high (max 3) to add a subtask.")
 
-                task.level = parent_task.level + 1
+                new_level = parent_task.level + 1
             else:  # parent_id es None
-                task.level = 1
+                new_level = 1
+            relevel = await self._check_subtree_move([Task.id == task_id], new_parent_id, new_level)
+            task.level = new_level
             task.parent_id = new_parent_id
 
         for key, value in update_data.items():
-            if key not in ['title', 'parent_id'] and hasattr(task, key):
+            if key not in ('parent_id', 'level') and hasattr(task, key):
                 setattr(task, key, value)
 
-        return await self.repository.update(task)
+        return await self._save(task, relevel=relevel)
+
+    async def delete(self, task_id: str) -> bool:
+        deleted = await super().delete(task_id)
+        if deleted:
+            deadline_scheduler.cancel(task_id)
+        return deleted
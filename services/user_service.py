@@ -1,7 +1,9 @@
 from typing import Optional
 
 from pydantic import EmailStr
+from sqlalchemy import case, or_
 
+from config.cache import user_cache, token_versions
 from models.models import User
 from repositories.user_repo import UserRepository
 from schemas.schemas import UserUpdate, UserCreate
@@ -17,22 +19,43 @@ class UserService(BaseService[User, UserCreate, UserUpdate, UserRepository]):
         if email_in_use and str(email_in_use.id) != exclude_user_id:
             raise ValueError(f"Email {email} is already in use.")
 
+    @staticmethod
+    def _invalidate_cached_user(*emails: Optional[str]) -> None:
+        # Los cambios de estado (is_active, is_admin, email) deben verse en el siguiente request
+        user_cache.invalidate(*(email for email in emails if email))
+
+    @staticmethod
+    def _token_state(user: User) -> tuple:
+        # Cambiar la contraseña, el email, la activación o el rol invalida los tokens ya emitidos
+        return user.password, user.email, user.is_active, user.is_admin
+
+    def _bump_token_version(self, user: User, previous_state: tuple) -> None:
+        if self._token_state(user) != previous_state:
+            user.token_version = (user.token_version or 0) + 1
+
     async def create(self, data: UserCreate) -> User:
         await self._validate_unique_email(data.email, exclude_user_id=None)
 
         user_model = self.model(**data.model_dump())
-        user_model.set_password(user_model.password)
+        # Sin retener una conexión del pool mientras se calcula el hash
+        await self.repository.release_connection()
+        await user_model.aset_password(user_model.password)
 
-        return await self.repository.create(user_model)
+        async with self.unit_of_work():
+            return await self.repository.create(user_model)
 
     async def update(self, user_id: str, data: UserUpdate) -> Optional[User]:
         user_to_update = await self.get_by_id(user_id)
         if not user_to_update:
             raise ValueError(f"User with ID {user_id} not found.")
 
-        # Manejo de actualización de contraseña
+        previous_email = user_to_update.email
+        previous_state = self._token_state(user_to_update)
+
+        # Manejo de actualización de contraseña (todavía no hay cambios pendientes: se suelta la conexión)
         if data.password:
-            user_to_update.set_password(data.password)
+            await self.repository.release_connection()
+            await user_to_update.aset_password(data.password)
 
         # Manejo de actualización de email
         if data.email and data.email != user_to_update.email:
@@ -45,26 +68,74 @@ class UserService(BaseService[User, UserCreate, UserUpdate, UserRepository]):
             if hasattr(user_to_update, key):
                 setattr(user_to_update, key, value)
 
-        return await self.repository.update(user_to_update)
+        self._bump_token_version(user_to_update, previous_state)
+        async with self.unit_of_work():
+            updated_user = await self.repository.update(user_to_update)
+        self._invalidate_cached_user(previous_email, updated_user.email)
+        token_versions.remember(updated_user)
+        return updated_user
 
     async def patch(self, user_id: str, data: UserUpdate) -> Optional[User]:
+        # Sin email ni contraseña no hay nada que validar ni hashear contra la fila actual:
+        # se escribe directamente con un único UPDATE ... RETURNING
+        if not data.email and not data.password:
+            return await self._patch_columns(user_id, data)
 
         user_to_patch = await self.repository.get_object_by_id(user_id)
         if not user_to_patch:
             raise ValueError(f"User with ID {user_id} not found.")
 
+        previous_email = user_to_patch.email
+        previous_state = self._token_state(user_to_patch)
+
+        # La contraseña va antes que el resto de cambios para poder soltar la conexión mientras se calcula el hash
+        if data.password:
+            await self.repository.release_connection()
+            await user_to_patch.aset_password(data.password)
+
         # validar email
         if data.email:
             if data.email != user_to_patch.email:
                 await self._validate_unique_email(data.email, exclude_user_id=user_id)
             user_to_patch.email = data.email
 
-        if data.password:
-            user_to_patch.set_password(data.password)
-
         # actualizar otros campos
         for key, value in data.model_dump(exclude={'password', 'email'}, exclude_unset=True, exclude_none=True).items():
             if hasattr(user_to_patch, key):
                 setattr(user_to_patch, key, value)
 
-        return await self.repository.update(user_to_patch)
+        self._bump_token_version(user_to_patch, previous_state)
+        async with self.unit_of_work():
+            patched_user = await self.repository.update(user_to_patch)
+        self._invalidate_cached_user(previous_email, patched_user.email)
+        token_versions.remember(patched_user)
+        return patched_user
+
+    async def _patch_columns(self, user_id: str, data: UserUpdate) -> User:
+        values = {
+            key: value for key, value in data.model_dump(exclude_unset=True, exclude_none=True).items()
+            if hasattr(User, key)
+        }
+        # La versión de token sube en la propia sentencia si cambia la activación o el rol
+        changes = [getattr(User, key) != value for key, value in values.items() if key in ('is_active', 'is_admin')]
+        if changes:
+            values['token_version'] = case((or_(*changes), User.token_version + 1), else_=User.token_version)
+
+        async with self.unit_of_work():
+            patched_user = await self.repository.update_by_id(user_id, values)
+        if not patched_user:
+            raise ValueError(f"User with ID {user_id} not found.")
+
+        self._invalidate_cached_user(patched_user.email)
+        token_versions.remember(patched_user)
+        return patched_user
+
+    async def delete(self, user_id: str) -> bool:
+        user = await self.repository.get_object_by_id(user_id)
+        if not user:
+            return False
+
+        deleted = await self.repository.delete(user)
+        self._invalidate_cached_user(user.email)
+        token_versions.forget(user_id)
+        return deleted
@@ -0,0 +1,103 @@
+import os
+import tempfile
+
+# La configuración se lee al importar config.settings: las pruebas usan una base SQLite temporal
+_db_dir = tempfile.mkdtemp(prefix='todo-tests-')
+os.environ['DATABASE_URL'] = f"sqlite+aiosqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ.setdefault('PROJECT_NAME', 'todo')
+os.environ.setdefault('PROJECT_DESCRIPTION', 'tests')
+os.environ.setdefault('PROJECT_VERSION', 'test')
+os.environ.setdefault('SECRET_KEY', 'test-secret')
+os.environ['DATABASE_REPLICA_URLS'] = ''
+os.environ['TASK_DEADLINE_SCHEDULER'] = 'false'
+# Las respuestas llevan X-Query-Count, con el que las pruebas cuentan las consultas de cada request
+os.environ['SQL_PROFILER'] = 'true'
+
+import httpx
+import pytest
+from sqlalchemy import event
+from sqlmodel import SQLModel
+
+from config.cache import token_cache, user_cache
+from config.database import async_session, engine
+from config.security import create_token, token_claims
+from main import app
+from models.models import Task, User
+
+
+@pytest.fixture
+def anyio_backend():
+    return 'asyncio'
+
+
+# Esquema nuevo para cada prueba, creado desde los modelos (mismos índices que las migraciones).
+# No incluye lo que solo crean las migraciones: los triggers de task_stats y la tabla de búsqueda tasks_fts,
+# así que aquí no se pueden probar GET /users/{user_id}/tasks/stats ni /tasks/search.
+# Las caches de autenticación se vacían para no arrastrar usuarios de la prueba anterior
+@pytest.fixture
+async def session():
+    token_cache.clear()
+    user_cache.clear()
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    async with async_session() as session:
+        yield session
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+    await engine.dispose()
+
+
+async def add_user(session, email: str) -> User:
+    user = User(first_names='Juan', last_names='Perez', email=email, password='x' * 60)
+    session.add(user)
+    await session.commit()
+    return user
+
+
+@pytest.fixture
+async def user(session):
+    return await add_user(session, 'juan@example.com')
+
+
+@pytest.fixture
+async def other_user(session):
+    return await add_user(session, 'otro@example.com')
+
+
+# Cabecera Authorization con un token de acceso válido para el usuario
+def auth_headers(user: User) -> dict:
+    return {'Authorization': f"Bearer {create_token(token_type='access', data=token_claims(user))}"}
+
+
+# Cliente HTTP sobre la app ASGI (sin lifespan: no arranca el planificador ni otras tareas de fondo)
+@pytest.fixture
+async def client(session):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+        yield client
+
+
+# Tareas de nivel 1, cada una con una subtarea
+@pytest.fixture
+def make_tasks(session, user):
+    async def make_tasks(count: int):
+        parents = [Task(title=f'tarea {i:04d}', user_id=user.id) for i in range(count)]
+        session.add_all(parents)
+        session.add_all(Task(title=f'subtarea {i:04d}', user_id=user.id, parent_id=parent.id, level=2)
+                        for i, parent in enumerate(parents))
+        await session.commit()
+        session.expunge_all()
+        return parents
+    return make_tasks
+
+
+# Registra las sentencias que se ejecutan mientras está activo, para inspeccionar su plan
+@pytest.fixture
+def captured_queries():
+    queries = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        queries.append((statement, parameters))
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+    yield queries
+    event.remove(engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
@@ -0,0 +1,42 @@
+import asyncio
+import time
+
+import pytest
+
+from config.hashing import pwd_context
+from conftest import auth_headers
+from models.models import Task
+
+pytestmark = pytest.mark.anyio
+
+LOGINS = 16
+
+
+# Una ráfaga de logins (bcrypt en cada uno) no debe frenar los requests baratos que llegan mientras tanto.
+# Si el hash se hiciera en el event loop, algún GET esperaría al menos un hash completo; con el pool de
+# config/hashing ninguno debería tardar tanto
+async def test_login_storm_does_not_stall_cheap_requests(session, client, user):
+    started_at = time.perf_counter()
+    user.password = pwd_context.hash('password1')
+    hash_seconds = time.perf_counter() - started_at
+    task = Task(title='tarea barata', user_id=user.id)
+    session.add(task)
+    await session.commit()
+    headers = auth_headers(user)
+    assert (await client.get(f'/tasks/{task.id}', headers=headers)).status_code == 200
+
+    async def login():
+        response = await client.post('/login', params={'email': user.email, 'password': 'password1'})
+        assert response.status_code == 200
+
+    storm = asyncio.gather(*(login() for _ in range(LOGINS)))
+    latencies = []
+    while not storm.done():
+        request_started_at = time.perf_counter()
+        response = await client.get(f'/tasks/{task.id}', headers=headers)
+        latencies.append(time.perf_counter() - request_started_at)
+        assert response.status_code == 200
+    await storm
+
+    assert len(latencies) >= LOGINS
+    assert max(latencies) < hash_seconds
@@ -0,0 +1,111 @@
+import warnings
+
+import pytest
+
+from conftest import auth_headers
+from repositories.task_repo import FILTER_INDEXES, TaskRepository
+from repositories.user_repo import UserRepository
+from schemas.schemas import TaskCreate, TaskListQuery
+from services.task_service import TaskService
+
+pytestmark = pytest.mark.anyio
+
+
+# Plan de SQLite de una sentencia capturada; SEARCH ... USING INDEX indica una búsqueda por el índice
+# (SCAN sería un recorrido completo de la tabla o del índice)
+async def query_plan(session, statement, parameters) -> str:
+    conn = await session.connection()
+    rows = (await conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)).all()
+    return '\n'.join(row[-1] for row in rows)
+
+
+# GET a través de la app: devuelve la respuesta, su X-Query-Count (consultas del request) y los avisos
+# emitidos mientras se atendía, p. ej. los de serialización de pydantic
+async def get_counted(client, url: str, headers: dict):
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        response = await client.get(url, headers=headers)
+    user_warnings = [str(warning.message) for warning in caught if issubclass(warning.category, UserWarning)]
+    return response, int(response.headers['x-query-count']), user_warnings
+
+
+async def test_title_lookup_uses_unique_index(session, user, make_tasks, captured_queries):
+    await make_tasks(20)
+    captured_queries.clear()
+    await TaskRepository(session).get_task_by_title('tarea 0001', user.id)
+
+    (statement, parameters), = captured_queries
+    assert 'SEARCH tasks USING INDEX ix_tasks_user_id_title' in await query_plan(session, statement, parameters)
+
+
+async def test_duplicate_title_is_rejected_by_index(session, user):
+    service = TaskService(TaskRepository(session), UserRepository(session))
+    await service.create(TaskCreate(title='tarea repetida', user_id=user.id))
+
+    with pytest.raises(ValueError, match='Task already exists'):
+        await service.create(TaskCreate(title='tarea repetida', user_id=user.id))
+
+
+async def test_subtask_loading_uses_parent_index(session, make_tasks, captured_queries):
+    parents = await make_tasks(20)
+    captured_queries.clear()
+    await TaskRepository(session).get_object_with_relations(parents[0].id)
+
+    statement, parameters = next(query for query in captured_queries if 'parent_id IN' in query[0])
+    assert 'SEARCH tasks USING INDEX ix_tasks_parent_id' in await query_plan(session, statement, parameters)
+
+
+async def test_bulk_title_check_uses_unique_index(session, user, make_tasks, captured_queries):
+    await make_tasks(20)
+    captured_queries.clear()
+    taken = await TaskRepository(session).get_existing_titles(
+        [(user.id, 'tarea 0001'), (user.id, 'subtarea 0002'), ('otro', 'tarea 0003')]
+    )
+
+    assert taken == {(user.id, 'tarea 0001'), (user.id, 'subtarea 0002')}
+    (statement, parameters), = captured_queries
+    plan = await query_plan(session, statement, parameters)
+    assert 'SEARCH tasks USING COVERING INDEX ix_tasks_user_id_title' in plan
+
+
+FILTER_VALUES = {'completed': False, 'priority': 'PODER', 'level': 1, 'parent_id': 'padre'}
+
+
+# Cada combinación admitida por filter_page debe resolverse buscando en un índice y en su orden,
+# sin recorrer todas las tareas del usuario ni ordenarlas aparte (USE TEMP B-TREE FOR ORDER BY)
+@pytest.mark.parametrize('filters, sort', [
+    (combination, sort) for combination, sorts in FILTER_INDEXES.items() for sort in sorts
+])
+async def test_filtered_listing_uses_index(session, user, make_tasks, captured_queries, filters, sort):
+    await make_tasks(20)
+    query = TaskListQuery(sort=sort, **{key: FILTER_VALUES[key] for key in filters})
+    captured_queries.clear()
+    await TaskRepository(session).filter_page(user.id, query, limit=10)
+
+    statement, parameters = captured_queries[0]
+    plan = await query_plan(session, statement, parameters)
+    assert 'SEARCH tasks USING INDEX' in plan
+    assert 'TEMP B-TREE' not in plan
+
+
+# Sin carga anticipada, cada tarea de la respuesta haría sus propias consultas de user y subtasks (N+1).
+# Los listados hacen siempre 4: las dos de versión del ETag (tareas y usuario), la página con el usuario
+# en el mismo SELECT y las subtareas de toda la página; una tarea sola, 3 (versión, tarea y subtareas)
+@pytest.mark.parametrize('count', [5, 50])
+async def test_task_routes_serialize_in_fixed_queries(client, user, make_tasks, count):
+    parents = await make_tasks(count)
+    headers = auth_headers(user)
+    # El primer request de un token lee el usuario; los siguientes lo toman de la cache
+    await client.get(f'/users/{user.id}', headers=headers)
+
+    response, queries, user_warnings = await get_counted(client, f'/tasks/user={user.id}/limit=1000/offset=0', headers)
+    assert response.status_code == 200 and len(response.json()) == 2 * count
+    assert queries == 4 and not user_warnings
+
+    response, queries, user_warnings = await get_counted(client, f'/tasks/user={user.id}/limit=1000', headers)
+    assert response.status_code == 200 and len(response.json()['items']) == 2 * count
+    assert queries == 4 and not user_warnings
+
+    response, queries, user_warnings = await get_counted(client, f'/tasks/{parents[0].id}', headers)
+    assert response.status_code == 200 and len(response.json()['subtasks']) == 1
+    assert queries == 3 and not user_warnings
@@ -0,0 +1,56 @@
+import json
+import time
+import warnings
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+
+from config.serialization import json_response
+from repositories.task_repo import TaskRepository
+from schemas.schemas import TaskResponse, task_list_adapter
+
+pytestmark = pytest.mark.anyio
+
+REPEAT = 5
+
+
+# Camino anterior de las rutas de listados: response_model valida cada tarea, jsonable_encoder la
+# convierte a tipos JSON y el json de la stdlib la codifica
+def encoded_by_response_model(tasks) -> bytes:
+    items = [TaskResponse.model_validate(task, from_attributes=True) for task in tasks]
+    return json.dumps(jsonable_encoder(items), separators=(',', ':')).encode()
+
+
+# Camino actual: TypeAdapter precompilado que valida desde los atributos del ORM y serializa a bytes
+def encoded_by_json_response(tasks) -> bytes:
+    return json_response(task_list_adapter, tasks).body
+
+
+# Mejor tiempo de REPEAT pasadas, en ms
+def best_ms(encode, tasks) -> float:
+    timings = []
+    for _ in range(REPEAT):
+        started_at = time.perf_counter()
+        encode(tasks)
+        timings.append(time.perf_counter() - started_at)
+    return min(timings) * 1000
+
+
+# Benchmark reproducible de la serialización de listados (con -s muestra los tiempos):
+#   python -m pytest tests/test_serialization.py -s
+# Las tareas vienen de la base con sus relaciones cargadas, igual que en GET /tasks/user={user_id}/...
+@pytest.mark.parametrize('count', [100, 1000])
+async def test_list_serialization_fast_path(session, user, make_tasks, count):
+    await make_tasks(count // 2)
+    tasks = await TaskRepository(session).get_all(limit=count)
+    assert len(tasks) == count
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', UserWarning)
+        assert json.loads(encoded_by_json_response(tasks)) == json.loads(encoded_by_response_model(tasks))
+
+    before = best_ms(encoded_by_response_model, tasks)
+    after = best_ms(encoded_by_json_response, tasks)
+    print(f'\n{count} tasks: response_model + jsonable_encoder {before:.1f} ms, json_response {after:.1f} ms '
+          f'({before / after:.1f}x)')
+    assert after < before
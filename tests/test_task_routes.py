@@ -0,0 +1,107 @@
+import pytest
+from sqlmodel import select
+
+from conftest import auth_headers
+from models.models import Task
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def tasks(session, user, other_user):
+    tasks = {
+        'task': Task(title='tarea a mover', user_id=user.id),
+        'own_parent': Task(title='padre propio', user_id=user.id),
+        'foreign_parent': Task(title='padre ajeno', user_id=other_user.id),
+    }
+    session.add_all(tasks.values())
+    await session.commit()
+    return {name: task.id for name, task in tasks.items()}
+
+
+@pytest.mark.parametrize('method', ['PATCH', 'PUT'])
+async def test_reparent_under_own_task(client, user, tasks, method):
+    response = await client.request(method, f"/tasks/{tasks['task']}", json={'parent_id': tasks['own_parent']},
+                                    headers=auth_headers(user))
+
+    assert response.status_code == 200
+    assert response.json()['parent_id'] == tasks['own_parent']
+    assert response.json()['level'] == 2
+
+
+@pytest.mark.parametrize('method', ['PATCH', 'PUT'])
+async def test_reparent_under_foreign_task_is_rejected(client, user, tasks, method):
+    response = await client.request(method, f"/tasks/{tasks['task']}", json={'parent_id': tasks['foreign_parent']},
+                                    headers=auth_headers(user))
+
+    assert response.status_code == 400
+    assert response.json()['detail'] == "You are not the owner of the new parent task."
+
+
+async def test_admin_can_reparent_under_any_task(session, client, user, tasks):
+    user.is_admin = True
+    await session.commit()
+    response = await client.patch(f"/tasks/{tasks['task']}", json={'parent_id': tasks['foreign_parent']},
+                                  headers=auth_headers(user))
+
+    assert response.status_code == 200
+    assert response.json()['parent_id'] == tasks['foreign_parent']
+
+
+# a > b > c (niveles 1, 2 y 3), d suelta y e > f
+@pytest.fixture
+async def tree(session, user):
+    a = Task(title='tarea a', user_id=user.id)
+    b = Task(title='tarea b', user_id=user.id, parent_id=a.id, level=2)
+    c = Task(title='tarea c', user_id=user.id, parent_id=b.id, level=3)
+    d = Task(title='tarea d', user_id=user.id)
+    e = Task(title='tarea e', user_id=user.id)
+    f = Task(title='tarea f', user_id=user.id, parent_id=e.id, level=2)
+    session.add_all([a, b, c, d, e, f])
+    await session.commit()
+    return {task.title[-1]: task.id for task in (a, b, c, d, e, f)}
+
+
+async def levels(session, tree) -> dict:
+    rows = (await session.exec(select(Task.id, Task.parent_id, Task.level))).all()
+    names = {task_id: name for name, task_id in tree.items()}
+    return {names[task_id]: (names.get(parent_id), level) for task_id, parent_id, level in rows}
+
+
+async def bulk_reparent(client, user, ids, parent_id):
+    return await client.patch('/tasks/bulk', json={'ids': ids, 'patch': {'parent_id': parent_id}},
+                              headers=auth_headers(user))
+
+
+async def test_bulk_reparent_under_own_subtask_is_rejected(session, client, user, tree):
+    response = await bulk_reparent(client, user, [tree['a']], tree['b'])
+
+    assert response.status_code == 400
+    assert response.json()['detail'] == "The new parent task is a subtask of a task being moved."
+    assert (await levels(session, tree))['a'] == (None, 1)
+
+
+async def test_bulk_reparent_too_deep_is_rejected(session, client, user, tree):
+    response = await bulk_reparent(client, user, [tree['a']], tree['d'])
+
+    assert response.status_code == 400
+    assert response.json()['detail'] == "The subtasks would exceed the max level (3) under the new parent."
+
+
+async def test_bulk_reparent_updates_descendant_levels(session, client, user, tree):
+    assert (await bulk_reparent(client, user, [tree['e']], tree['d'])).status_code == 200
+    assert (await bulk_reparent(client, user, [tree['b']], None)).status_code == 200
+
+    current = await levels(session, tree)
+    assert current['e'] == ('d', 2) and current['f'] == ('e', 3)
+    assert current['b'] == (None, 1) and current['c'] == ('b', 2)
+
+
+async def test_patch_reparent_checks_and_updates_subtree(session, client, user, tree):
+    response = await client.patch(f"/tasks/{tree['a']}", json={'parent_id': tree['c']}, headers=auth_headers(user))
+    assert response.status_code == 400
+
+    response = await client.patch(f"/tasks/{tree['b']}", json={'parent_id': tree['d']}, headers=auth_headers(user))
+    assert response.status_code == 200
+    current = await levels(session, tree)
+    assert current['b'] == ('d', 2) and current['c'] == ('b', 3)